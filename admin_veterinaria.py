@@ -1,30 +1,94 @@
-import sqlite3
+import argparse
+import contextlib
+import functools
+import io
+import itertools
+import json
 import os
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from collections import OrderedDict, deque, namedtuple
+# csv, gzip y shlex se importan dentro de las funciones que los usan, así los
+# comandos cortos no pagan su carga al arrancar.
 
 # --- Configuración de la Base de Datos ---
 
 DB_NAME = "veterinaria.db"
 
-def crear_base_datos():
+# Ajustes de rendimiento aplicados a cada conexión; se pueden sobrescribir
+# pasando un diccionario 'config' o con la opción --pragma de la línea de comandos.
+CONFIG_CONEXION = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+    "cache_size": -64 * 1024,        # negativo = KiB (64 MiB)
+}
+PRAGMAS_CONFIGURABLES = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
+def configurar_conexion(conexion, config=None):
+    """
+    Aplica los PRAGMA de CONFIG_CONEXION a una conexión, combinados con 'config'.
+    Un valor None en 'config' deja el PRAGMA con su valor por defecto de SQLite.
+    """
+    ajustes = {**CONFIG_CONEXION, **(config or {})}
+    for pragma, valor in ajustes.items():
+        if pragma not in PRAGMAS_CONFIGURABLES:
+            raise ValueError(f"PRAGMA no configurable: {pragma}")
+        if valor is None:
+            continue
+        if not str(valor).lstrip("-").isalnum():
+            raise ValueError(f"Valor no válido para PRAGMA {pragma}: {valor!r}")
+        conexion.execute(f"PRAGMA {pragma} = {valor}")
+
+def conectar(ruta=DB_NAME, config=None, **opciones):
+    """
+    Abre una conexión a 'ruta' con los PRAGMA de CONFIG_CONEXION y las claves foráneas activas.
+    Las 'opciones' se pasan a sqlite3.connect; con las trazas activas la conexión se mide.
+    """
+    opciones.setdefault("factory", ConexionTrazada if TRAZAS.activo else Conexion)
+    conexion = sqlite3.connect(ruta, **opciones)
+    configurar_conexion(conexion, config)
+    # SQLite no aplica las claves foráneas (ni el ON DELETE CASCADE) si no se
+    # activan en cada conexión.
+    conexion.execute("PRAGMA foreign_keys = ON")
+    return conexion
+
+def _conectar_copia(ruta):
+    """Abre una copia (o la base a verificar) sin los PRAGMA de conectar(), que la pasarían a WAL, medida si hay trazas."""
+    return sqlite3.connect(ruta, factory=ConexionTrazada if TRAZAS.activo else Conexion)
+
+def crear_base_datos(ruta=DB_NAME, config=None):
     """
     Crea o se conecta a la base de datos SQLite y retorna la conexión y el cursor.
     Si el archivo de la DB existe, lo elimina para empezar limpio.
     """
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-        print(f"Base de datos anterior eliminada: {DB_NAME}")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+        print(f"Base de datos anterior eliminada: {ruta}")
+    limpiar_cache()
+    # Archivos auxiliares del modo WAL que pudieran quedar de la ejecución anterior.
+    for sufijo in ("-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
 
-    conexion = sqlite3.connect(DB_NAME)
+    conexion = conectar(ruta, config)
     cursor = conexion.cursor()
-    print(f"Base de datos creada/conectada: {DB_NAME}")
+    print(f"Base de datos creada/conectada: {ruta}")
     return conexion, cursor
 
-def crear_tablas(cursor):
-    """
-    Crea las tablas 'Dueños', 'Mascotas' y 'Consultas' en la base de datos.
-    """
-    # Tabla Dueños
-    sql_crear_duenos = """
+def abrir_base_datos(ruta=DB_NAME, config=None):
+    """Abre la base conservando sus datos, aplica las migraciones pendientes y retorna la conexión y el cursor."""
+    conexion = conectar(ruta, config)
+    migrar_esquema(conexion)
+    return conexion, conexion.cursor()
+
+SQL_CREAR_DUEÑOS = """
     CREATE TABLE IF NOT EXISTS Dueños (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         nombre TEXT NOT NULL,
@@ -32,11 +96,8 @@ def crear_tablas(cursor):
         direccion TEXT
     );
     """
-    cursor.execute(sql_crear_duenos)
-    print("Tabla 'Dueños' creada exitosamente.")
 
-    # Tabla Mascotas
-    sql_crear_mascotas = """
+SQL_CREAR_MASCOTAS = """
     CREATE TABLE IF NOT EXISTS Mascotas (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         nombre TEXT NOT NULL,
@@ -47,11 +108,8 @@ def crear_tablas(cursor):
         FOREIGN KEY (id_dueño) REFERENCES Dueños(id) ON DELETE CASCADE
     );
     """
-    cursor.execute(sql_crear_mascotas)
-    print("Tabla 'Mascotas' creada exitosamente.")
 
-    # Tabla Consultas
-    sql_crear_consultas = """
+SQL_CREAR_CONSULTAS = """
     CREATE TABLE IF NOT EXISTS Consultas (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         fecha TEXT NOT NULL, -- Formato YYYY-MM-DD HH:MM:SS
@@ -61,121 +119,1384 @@ def crear_tablas(cursor):
         FOREIGN KEY (id_mascota) REFERENCES Mascotas(id) ON DELETE CASCADE
     );
     """
-    cursor.execute(sql_crear_consultas)
+
+def crear_tablas(cursor):
+    """
+    Crea las tablas 'Dueños', 'Mascotas' y 'Consultas' en la base de datos.
+    """
+    # Tabla Dueños
+    cursor.execute(SQL_CREAR_DUEÑOS)
+    print("Tabla 'Dueños' creada exitosamente.")
+
+    # Tabla Mascotas
+    cursor.execute(SQL_CREAR_MASCOTAS)
+    print("Tabla 'Mascotas' creada exitosamente.")
+
+    # Tabla Consultas
+    cursor.execute(SQL_CREAR_CONSULTAS)
     print("Tabla 'Consultas' creada exitosamente.")
 
+# --- Fechas de las Consultas ---
+
+# Las fechas se guardan como texto ISO con segundos y sin zona horaria, así el
+# orden alfabético coincide con el cronológico y el índice sobre 'fecha'
+# sirve para buscar por rangos.
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+FORMATOS_FECHA_ADICIONALES = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+def normalizar_fecha(valor):
+    """
+    Convierte una fecha (datetime, date, texto ISO o DD/MM/YYYY) a 'YYYY-MM-DD HH:MM:SS' en hora local.
+    Lanza ValueError si la fecha no es válida.
+    """
+    if isinstance(valor, datetime):
+        momento = valor
+    elif isinstance(valor, date):
+        momento = datetime(valor.year, valor.month, valor.day)
+    elif isinstance(valor, str):
+        texto = valor.strip()
+        try:
+            momento = datetime.fromisoformat(texto)
+        except ValueError:
+            for formato in FORMATOS_FECHA_ADICIONALES:
+                try:
+                    momento = datetime.strptime(texto, formato)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Fecha no válida: {valor!r}. Use el formato YYYY-MM-DD HH:MM:SS.") from None
+    else:
+        raise ValueError(f"Fecha no válida: {valor!r}. Use el formato YYYY-MM-DD HH:MM:SS.")
+    if momento.tzinfo is not None:
+        momento = momento.astimezone().replace(tzinfo=None)
+    return momento.strftime(FORMATO_FECHA)
+
+def _normalizar_fechas_existentes(conexion):
+    """
+    Paso de migración: lleva al formato normalizado las fechas ya guardadas.
+    Las que no se pueden interpretar se dejan como están y se informa cuántas son.
+    """
+    cambios = []
+    no_validas = 0
+    for id_consulta, fecha in conexion.execute("SELECT id, fecha FROM Consultas"):
+        try:
+            normalizada = normalizar_fecha(fecha)
+        except ValueError:
+            no_validas += 1
+            continue
+        if normalizada != fecha:
+            cambios.append((normalizada, id_consulta))
+    conexion.executemany("UPDATE Consultas SET fecha = ? WHERE id = ?", cambios)
+    if no_validas:
+        print(f"Aviso: {no_validas} consultas tienen una fecha no válida y no se normalizaron.")
+
+# --- Estadísticas de la Clínica ---
+
+# Resúmenes de visitas que se mantienen al día con triggers, para que los
+# reportes no tengan que recorrer y unir Consultas, Mascotas y Dueños.
+# Cada consulta cuya mascota y dueño existen (las mismas que muestra un JOIN)
+# suma una visita en cada dimensión.
+DIMENSIONES_ESTADISTICAS = ("especie", "dueño", "mes", "motivo")
+SIN_ESPECIE = "(sin especie)"
+
+# Consultas con su mascota y dueño: la fuente completa de las estadísticas.
+SQL_ORIGEN_ESTADISTICAS = """
+    SELECT m.especie, m.id_dueño, c.fecha, c.motivo
+    FROM Consultas c JOIN Mascotas m ON m.id = c.id_mascota JOIN Dueños d ON d.id = m.id_dueño
+    """
+
+def _sql_agregar_estadisticas(origen, signo=1):
+    """
+    Retorna un SELECT (dimension, clave, visitas) que cuenta por dimensión las filas de 'origen'
+    (especie, id_dueño, fecha, motivo), multiplicadas por 'signo' (+1 al agregar, -1 al quitar).
+    """
+    return f"""
+        SELECT dimension, clave, SUM(cantidad) AS visitas FROM (
+            SELECT 'especie' AS dimension, COALESCE(especie, '{SIN_ESPECIE}') AS clave, {signo} AS cantidad FROM ({origen})
+            UNION ALL SELECT 'dueño', id_dueño, {signo} FROM ({origen})
+            UNION ALL SELECT 'mes', substr(fecha, 1, 7), {signo} FROM ({origen})
+            UNION ALL SELECT 'motivo', motivo, {signo} FROM ({origen})
+        ) WHERE true GROUP BY dimension, clave
+        """
+
+def _sql_acumular_estadisticas(origen, signo):
+    """Retorna el INSERT que suma al resumen las visitas de 'origen' (ver _sql_agregar_estadisticas)."""
+    return f"""
+        INSERT INTO Estadisticas (dimension, clave, visitas)
+        {_sql_agregar_estadisticas(origen, signo)}
+        ON CONFLICT (dimension, clave) DO UPDATE SET visitas = visitas + excluded.visitas;
+        """
+
+def _origen_consulta(fila):
+    """Origen de una consulta (NEW u OLD) si su mascota y su dueño existen."""
+    return f"""
+        SELECT m.especie, m.id_dueño, {fila}.fecha AS fecha, {fila}.motivo AS motivo
+        FROM Mascotas m JOIN Dueños d ON d.id = m.id_dueño WHERE m.id = {fila}.id_mascota
+        """
+
+def _origen_mascota(fila):
+    """Origen de las consultas de una mascota (NEW u OLD) si su dueño existe."""
+    return f"""
+        SELECT {fila}.especie AS especie, {fila}.id_dueño AS id_dueño, c.fecha, c.motivo
+        FROM Consultas c WHERE c.id_mascota = {fila}.id AND EXISTS (SELECT 1 FROM Dueños WHERE id = {fila}.id_dueño)
+        """
+
+def _origen_dueño(fila):
+    """Origen de las consultas de todas las mascotas de un dueño (NEW u OLD)."""
+    return f"""
+        SELECT m.especie, m.id_dueño, c.fecha, c.motivo
+        FROM Mascotas m JOIN Consultas c ON c.id_mascota = m.id WHERE m.id_dueño = {fila}.id
+        """
+
+# Cuando se borra un dueño o una mascota, los triggers BEFORE DELETE descuentan
+# sus consultas mientras aún existen. Los borrados en cascada que siguen ya no
+# encuentran al padre y no descuentan dos veces.
+SQL_ESTADISTICAS = (
+    """
+    CREATE TABLE IF NOT EXISTS Estadisticas (
+        dimension TEXT NOT NULL, -- 'especie', 'dueño', 'mes' (YYYY-MM) o 'motivo'
+        clave NOT NULL,
+        visitas INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, clave)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_estadisticas_visitas ON Estadisticas(dimension, visitas)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_consultas_insertar AFTER INSERT ON Consultas BEGIN
+        {_sql_acumular_estadisticas(_origen_consulta("NEW"), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_consultas_eliminar AFTER DELETE ON Consultas BEGIN
+        {_sql_acumular_estadisticas(_origen_consulta("OLD"), -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_consultas_actualizar AFTER UPDATE OF fecha, motivo, id_mascota ON Consultas BEGIN
+        {_sql_acumular_estadisticas(_origen_consulta("OLD"), -1)}
+        {_sql_acumular_estadisticas(_origen_consulta("NEW"), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_mascotas_insertar AFTER INSERT ON Mascotas BEGIN
+        {_sql_acumular_estadisticas(_origen_mascota("NEW"), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_mascotas_eliminar BEFORE DELETE ON Mascotas BEGIN
+        {_sql_acumular_estadisticas(_origen_mascota("OLD"), -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_mascotas_actualizar AFTER UPDATE OF id, especie, id_dueño ON Mascotas BEGIN
+        {_sql_acumular_estadisticas(_origen_mascota("OLD"), -1)}
+        {_sql_acumular_estadisticas(_origen_mascota("NEW"), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_dueños_insertar AFTER INSERT ON Dueños BEGIN
+        {_sql_acumular_estadisticas(_origen_dueño("NEW"), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_dueños_eliminar BEFORE DELETE ON Dueños BEGIN
+        {_sql_acumular_estadisticas(_origen_dueño("OLD"), -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_estadisticas_dueños_actualizar AFTER UPDATE OF id ON Dueños BEGIN
+        {_sql_acumular_estadisticas(_origen_dueño("OLD"), -1)}
+        {_sql_acumular_estadisticas(_origen_dueño("NEW"), 1)}
+    END
+    """,
+)
+
+def reconstruir_estadisticas(conexion):
+    """Vuelve a calcular desde cero todas las estadísticas materializadas."""
+    conexion.execute("DELETE FROM Estadisticas")
+    conexion.execute(f"INSERT INTO Estadisticas (dimension, clave, visitas) {_sql_agregar_estadisticas(SQL_ORIGEN_ESTADISTICAS)}")
+    conexion.commit()
+
+SQL_ESTADISTICAS_GUARDADAS = "SELECT dimension, clave, visitas FROM Estadisticas WHERE visitas != 0"
+
+def verificar_estadisticas(conexion, reparar=False):
+    """
+    Retorna las diferencias (dimensión, clave, materializado, calculado) con las estadísticas calculadas
+    desde cero; con reparar=True, si hay diferencias se reconstruyen.
+    """
+    materializadas = {
+        (dimension, clave): visitas
+        for dimension, clave, visitas in conexion.execute(SQL_ESTADISTICAS_GUARDADAS)
+    }
+    calculadas = {
+        (dimension, clave): visitas
+        for dimension, clave, visitas in conexion.execute(_sql_agregar_estadisticas(SQL_ORIGEN_ESTADISTICAS))
+    }
+    diferencias = [
+        (dimension, clave, materializadas.get((dimension, clave), 0), calculadas.get((dimension, clave), 0))
+        for dimension, clave in sorted(materializadas.keys() | calculadas.keys(), key=repr)
+        if materializadas.get((dimension, clave), 0) != calculadas.get((dimension, clave), 0)
+    ]
+    if diferencias and reparar:
+        reconstruir_estadisticas(conexion)
+    return diferencias
+
+SQL_REPORTE_VISITAS = "SELECT clave, visitas FROM Estadisticas WHERE dimension = ? AND visitas > 0 ORDER BY visitas DESC LIMIT ?"
+SQL_REPORTE_MESES = "SELECT clave, visitas FROM Estadisticas WHERE dimension = ? AND visitas > 0 ORDER BY clave LIMIT ?"
+SQL_REPORTE_DUEÑOS = """
+    SELECT e.clave || ' - ' || d.nombre, e.visitas FROM Estadisticas e JOIN Dueños d ON d.id = e.clave
+    WHERE e.dimension = ? AND e.visitas > 0 ORDER BY e.visitas DESC LIMIT ?
+    """
+
+def reporte_visitas(cursor, dimension, limite=None):
+    """
+    Retorna las visitas por 'dimension' ('especie', 'dueño', 'mes' o 'motivo') como lista de (clave, visitas),
+    de mayor a menor (los meses en orden cronológico; para 'dueño' la clave es '<id> - <nombre>').
+    """
+    if dimension not in DIMENSIONES_ESTADISTICAS:
+        raise ValueError(f"Dimensión desconocida: {dimension!r}")
+    if dimension == "dueño":
+        sql = SQL_REPORTE_DUEÑOS
+    elif dimension == "mes":
+        sql = SQL_REPORTE_MESES
+    else:
+        sql = SQL_REPORTE_VISITAS
+    cursor.execute(sql, (dimension, -1 if limite is None else limite))
+    return cursor.fetchall()
+
+def mostrar_reporte(cursor, dimension, limite=None):
+    """Muestra un reporte de visitas. Retorna la cantidad de filas mostradas."""
+    titulos = {"especie": "VISITAS POR ESPECIE", "dueño": "VISITAS POR DUEÑO", "mes": "VISITAS POR MES", "motivo": "MOTIVOS DE CONSULTA MÁS COMUNES"}
+    print(f"\n--- {titulos[dimension]} ---")
+    filas = reporte_visitas(cursor, dimension, limite)
+    for clave, visitas in filas:
+        print(f"{clave}: {visitas}")
+    if not filas:
+        print("No hay consultas registradas.")
+    return len(filas)
+
+def mostrar_verificacion_estadisticas(conexion, reparar=False):
+    """Muestra el resultado de verificar_estadisticas. Retorna True si eran consistentes."""
+    print("\n--- VERIFICACIÓN DE ESTADÍSTICAS ---")
+    diferencias = verificar_estadisticas(conexion, reparar)
+    for dimension, clave, materializado, calculado in diferencias[:20]:
+        print(f"{dimension} '{clave}': guardado {materializado}, calculado {calculado}")
+    if len(diferencias) > 20:
+        print(f"... y {len(diferencias) - 20} diferencias más.")
+    if not diferencias:
+        print("Las estadísticas son consistentes.")
+    elif reparar:
+        print("Estadísticas reconstruidas desde cero.")
+    return not diferencias
+
+# --- Registro de Cambios ---
+
+# Cada alta, modificación o baja de las tres tablas deja una fila en Cambios
+# con un número de secuencia creciente (AUTOINCREMENT nunca reutiliza uno),
+# para que la sincronización envíe solo lo que cambió desde la última vez.
+# Solo se anota qué registro cambió; sus valores se leen al sincronizar.
+TABLAS_REGISTRADAS = ("Dueños", "Mascotas", "Consultas")
+
+def _sql_triggers_cambios(tabla):
+    return (
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla.lower()}_insertar AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO Cambios (tabla, id, operacion) VALUES ('{tabla}', NEW.id, 'I');
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla.lower()}_actualizar AFTER UPDATE ON {tabla} BEGIN
+            INSERT INTO Cambios (tabla, id, operacion) SELECT '{tabla}', OLD.id, 'D' WHERE OLD.id IS NOT NEW.id;
+            INSERT INTO Cambios (tabla, id, operacion) VALUES ('{tabla}', NEW.id, 'U');
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla.lower()}_eliminar AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO Cambios (tabla, id, operacion) VALUES ('{tabla}', OLD.id, 'D');
+        END
+        """,
+    )
+
+# Registra como altas todos los registros existentes.
+SQL_SEMBRAR_CAMBIOS = tuple(
+    f"INSERT INTO Cambios (tabla, id, operacion) SELECT '{tabla}', id, 'I' FROM {tabla} ORDER BY id"
+    for tabla in TABLAS_REGISTRADAS
+)
+
+SQL_REGISTRO_CAMBIOS = (
+    """
+    CREATE TABLE IF NOT EXISTS Cambios (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tabla TEXT NOT NULL,
+        id INTEGER NOT NULL,
+        operacion TEXT NOT NULL CHECK (operacion IN ('I', 'U', 'D'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cambios_tabla_seq ON Cambios(tabla, seq)",
+    # Identificador propio de esta base de datos, para que el destino sepa hasta
+    # qué secuencia aplicó los cambios de cada origen aunque se mueva el archivo.
+    "CREATE TABLE IF NOT EXISTS Nodo (id TEXT NOT NULL)",
+    "INSERT INTO Nodo (id) SELECT lower(hex(randomblob(16))) WHERE NOT EXISTS (SELECT 1 FROM Nodo)",
+    """
+    CREATE TABLE IF NOT EXISTS Sincronizacion (
+        origen TEXT PRIMARY KEY,
+        ultimo_seq INTEGER NOT NULL
+    )
+    """,
+    *(trigger for tabla in TABLAS_REGISTRADAS for trigger in _sql_triggers_cambios(tabla)),
+    # Los registros que ya existían entran como altas en la primera sincronización.
+    *SQL_SEMBRAR_CAMBIOS,
+)
+
+# --- Migraciones de Esquema ---
+
+# Cada migración es (versión, pasos). Un paso es una sentencia SQL o una función
+# que recibe la conexión. La versión aplicada se guarda en PRAGMA user_version,
+# así que al abrir una base de datos existente solo se ejecutan las que faltan.
+MIGRACIONES = [
+    (1, (SQL_CREAR_DUEÑOS, SQL_CREAR_MASCOTAS, SQL_CREAR_CONSULTAS)),
+    # Índices para las búsquedas por clave foránea (listados por dueño/mascota
+    # y borrados en cascada) y para filtrar consultas por fecha.
+    (2, (
+        "CREATE INDEX IF NOT EXISTS idx_mascotas_id_dueño ON Mascotas(id_dueño)",
+        "CREATE INDEX IF NOT EXISTS idx_consultas_id_mascota ON Consultas(id_mascota)",
+        "CREATE INDEX IF NOT EXISTS idx_consultas_fecha ON Consultas(fecha)",
+    )),
+    # Índice de texto completo (FTS5) sobre motivo y diagnóstico. La tabla virtual
+    # no duplica el texto (content='Consultas') y los triggers la mantienen al día.
+    (3, (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS ConsultasFTS USING fts5(
+            motivo, diagnostico,
+            content='Consultas', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_consultas_fts_insertar AFTER INSERT ON Consultas BEGIN
+            INSERT INTO ConsultasFTS (rowid, motivo, diagnostico) VALUES (NEW.id, NEW.motivo, NEW.diagnostico);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_consultas_fts_eliminar AFTER DELETE ON Consultas BEGIN
+            INSERT INTO ConsultasFTS (ConsultasFTS, rowid, motivo, diagnostico) VALUES ('delete', OLD.id, OLD.motivo, OLD.diagnostico);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_consultas_fts_actualizar AFTER UPDATE OF id, motivo, diagnostico ON Consultas BEGIN
+            INSERT INTO ConsultasFTS (ConsultasFTS, rowid, motivo, diagnostico) VALUES ('delete', OLD.id, OLD.motivo, OLD.diagnostico);
+            INSERT INTO ConsultasFTS (rowid, motivo, diagnostico) VALUES (NEW.id, NEW.motivo, NEW.diagnostico);
+        END
+        """,
+        # Indexa las consultas que ya existían antes de esta migración.
+        "INSERT INTO ConsultasFTS (ConsultasFTS) VALUES ('rebuild')",
+    )),
+    # Fechas normalizadas y validadas, e índice (id_mascota, fecha) para las
+    # últimas visitas de una mascota; reemplaza al índice de solo id_mascota.
+    (4, (
+        _normalizar_fechas_existentes,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_consultas_fecha_insertar BEFORE INSERT ON Consultas
+        WHEN datetime(NEW.fecha) IS NOT NEW.fecha BEGIN
+            SELECT RAISE(ABORT, 'fecha no válida: use el formato YYYY-MM-DD HH:MM:SS');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_consultas_fecha_actualizar BEFORE UPDATE OF fecha ON Consultas
+        WHEN datetime(NEW.fecha) IS NOT NEW.fecha BEGIN
+            SELECT RAISE(ABORT, 'fecha no válida: use el formato YYYY-MM-DD HH:MM:SS');
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_consultas_mascota_fecha ON Consultas(id_mascota, fecha)",
+        "DROP INDEX IF EXISTS idx_consultas_id_mascota",
+    )),
+    # Estadísticas materializadas para los reportes.
+    (5, (
+        *SQL_ESTADISTICAS,
+        f"INSERT INTO Estadisticas (dimension, clave, visitas) {_sql_agregar_estadisticas(SQL_ORIGEN_ESTADISTICAS)}",
+    )),
+    # Registro de cambios para la sincronización entre clínicas.
+    (6, SQL_REGISTRO_CAMBIOS),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+def version_esquema(conexion):
+    """Retorna la versión de esquema guardada en PRAGMA user_version."""
+    return conexion.execute("PRAGMA user_version").fetchone()[0]
+
+def migrar_esquema(conexion):
+    """Aplica las migraciones pendientes, cada una en su propia transacción, y retorna la versión anterior."""
+    version_inicial = version_esquema(conexion)
+    for version, pasos in MIGRACIONES:
+        if version <= version_inicial:
+            continue
+        try:
+            conexion.execute("BEGIN")
+            for paso in pasos:
+                if callable(paso):
+                    paso(conexion)
+                else:
+                    conexion.execute(paso)
+            conexion.execute(f"PRAGMA user_version = {version}")
+            conexion.commit()
+        except sqlite3.Error:
+            conexion.rollback()
+            raise
+        print(f"Esquema de la base de datos actualizado a la versión {version}.")
+    return version_inicial
+
+# --- Capa de Acceso a Datos ---
+
+TAMAÑO_PAGINA = 20
+ID_MINIMO = -2**63  # Menor valor de un INTEGER de SQLite: punto de partida de la paginación
+
+def _iterar_paginado(cursor, sql, params, tamaño_pagina, despues_de=ID_MINIMO):
+    """Genera las filas de 'sql' (con el id primero) con id mayor que 'despues_de', de a 'tamaño_pagina' por consulta."""
+    ultimo_id = despues_de
+    while True:
+        cursor.execute(sql, (*params, ultimo_id, tamaño_pagina))
+        # Página completa antes de entregarla: el cursor queda libre para otras consultas.
+        pagina = cursor.fetchall()
+        yield from pagina
+        if len(pagina) < tamaño_pagina:
+            return
+        ultimo_id = pagina[-1][0]
+
+# --- Caché de Dueños y Mascotas ---
+
+class CacheLRU:
+    """
+    Caché LRU de registros por id, segura entre hilos, con tamaño máximo y vencimiento de 'ttl' segundos.
+    'generacion' aumenta con cada invalidación; guardar() descarta lo leído antes de la última.
+    """
+
+    def __init__(self, capacidad=10000, ttl=300.0):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.generacion = 0
+        self._datos = OrderedDict()  # id -> (registro, instante de vencimiento)
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el registro guardado para 'clave', o None si no está o venció."""
+        with self._bloqueo:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada[1] > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return entrada[0]
+                del self._datos[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, registro, generacion=None):
+        """
+        Guarda un registro, descartando el menos usado si se supera la capacidad.
+        Si se indica 'generacion' y hubo invalidaciones desde entonces, no se guarda.
+        """
+        with self._bloqueo:
+            if generacion is not None and generacion != self.generacion:
+                return
+            self._datos[clave] = (registro, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        """Descarta el registro guardado para 'clave', si lo hay."""
+        with self._bloqueo:
+            self.generacion += 1
+            self._datos.pop(clave, None)
+
+    def invalidar_si(self, condicion):
+        """Descarta todos los registros para los que condicion(clave, registro) es verdadera."""
+        with self._bloqueo:
+            self.generacion += 1
+            for clave in [c for c, (registro, _) in self._datos.items() if condicion(c, registro)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        """Descarta todos los registros (los contadores se conservan)."""
+        with self._bloqueo:
+            self.generacion += 1
+            self._datos.clear()
+
+    def estadisticas(self):
+        """Retorna los aciertos, fallos, tasa de aciertos y tamaño actual."""
+        with self._bloqueo:
+            consultas = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "tamaño": len(self._datos),
+                "capacidad": self.capacidad,
+            }
+
+CACHE_DUEÑOS = CacheLRU()
+CACHE_MASCOTAS = CacheLRU()
+
+def estadisticas_cache():
+    """Retorna las estadísticas de las cachés de dueños y de mascotas."""
+    return {"Dueños": CACHE_DUEÑOS.estadisticas(), "Mascotas": CACHE_MASCOTAS.estadisticas()}
+
+def limpiar_cache():
+    """Vacía las cachés de dueños y de mascotas."""
+    CACHE_DUEÑOS.limpiar()
+    CACHE_MASCOTAS.limpiar()
+
+def clave_base_datos(conexion):
+    """Retorna la ruta del archivo de la conexión (o un valor propio si está en memoria), para separar las cachés por base."""
+    clave = getattr(conexion, "clave_cache", None)
+    if clave is None:
+        clave = conexion.execute("PRAGMA database_list").fetchone()[2] or id(conexion)
+        if isinstance(conexion, Conexion):
+            conexion.clave_cache = clave
+    return clave
+
+class Conexion(sqlite3.Connection):
+    """Conexión de conectar(): repite las invalidaciones de caché de la transacción al confirmarla, deshacerla o cerrarse."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.clave_cache = None
+        self.invalidaciones_pendientes = []
+
+    def _aplicar_invalidaciones(self):
+        pendientes, self.invalidaciones_pendientes = self.invalidaciones_pendientes, []
+        for invalidar in pendientes:
+            invalidar()
+
+    def commit(self):
+        super().commit()
+        self._aplicar_invalidaciones()
+
+    def rollback(self):
+        super().rollback()
+        self._aplicar_invalidaciones()
+
+    def close(self):
+        super().close()
+        self._aplicar_invalidaciones()
+
+    # El __exit__ de sqlite3 no llama a los commit() y rollback() redefinidos.
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            self.rollback()
+            return False
+        try:
+            self.commit()
+        except sqlite3.Error:
+            self.rollback()
+            raise
+        return False
+
+# Registros inmutables y compactos (sin __dict__) para las filas de cada tabla.
+Dueño = namedtuple("Dueño", "id nombre telefono direccion")
+Mascota = namedtuple("Mascota", "id nombre especie raza edad id_dueño")
+Consulta = namedtuple("Consulta", "id fecha motivo diagnostico id_mascota")
+
+@functools.lru_cache(maxsize=None)
+def _sql_actualizar(tabla, columnas):
+    """
+    Retorna el UPDATE de una combinación de columnas, siempre con el mismo texto para que sqlite3
+    reutilice la sentencia preparada de su caché.
+    """
+    return f"UPDATE {tabla} SET {', '.join(c + ' = ?' for c in columnas)} WHERE id = ?"
+
+class _Repositorio:
+    """
+    Acceso a los registros de una tabla; cada subclase define TABLA, COLUMNAS (sin el id) y REGISTRO.
+    Con confirmar=False no se hace commit tras cada operación.
+    """
+    __slots__ = ("conexion", "cursor", "confirmar", "base")
+
+    TABLA = None
+    COLUMNAS = ()
+    REGISTRO = None
+    CACHE = None  # CacheLRU de lectura para obtener(), si la tabla la usa; clave (base, id)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        columnas = ", ".join(cls.COLUMNAS)
+        cls.SQL_INSERTAR = f"INSERT INTO {cls.TABLA} ({columnas}) VALUES ({', '.join('?' * len(cls.COLUMNAS))})"
+        cls.SQL_OBTENER = f"SELECT id, {columnas} FROM {cls.TABLA} WHERE id = ?"
+        cls.SQL_PAGINA = f"SELECT id, {columnas} FROM {cls.TABLA} WHERE id > ? ORDER BY id LIMIT ?"
+        cls.SQL_ELIMINAR = f"DELETE FROM {cls.TABLA} WHERE id = ?"
+
+    def __init__(self, conexion, cursor=None, confirmar=True):
+        self.conexion = conexion
+        self.cursor = cursor if cursor is not None else conexion.cursor()
+        self.confirmar = confirmar
+        self.base = clave_base_datos(conexion) if self.CACHE is not None else None
+
+    def _confirmar(self):
+        if self.confirmar:
+            self.conexion.commit()
+
+    def insertar(self, *valores):
+        """Inserta un registro con los valores de COLUMNAS y retorna su id."""
+        self.cursor.execute(self.SQL_INSERTAR, valores)
+        self._confirmar()
+        return self.cursor.lastrowid
+
+    def obtener(self, id_registro):
+        """Retorna el registro con ese id, o None si no existe. Usa la caché si la hay."""
+        if self.CACHE is not None:
+            registro = self.CACHE.obtener((self.base, id_registro))
+            if registro is not None:
+                return registro
+            generacion = self.CACHE.generacion
+        fila = self.cursor.execute(self.SQL_OBTENER, (id_registro,)).fetchone()
+        if not fila:
+            return None
+        registro = self.REGISTRO._make(fila)
+        if self.CACHE is not None:
+            self.CACHE.guardar((self.base, id_registro), registro, generacion)
+        return registro
+
+    def _descartar(self, invalidar):
+        """
+        Aplica la invalidación 'invalidar' ahora, para esta conexión, y otra vez
+        al terminar la transacción (ver Conexion), para las demás.
+        """
+        invalidar()
+        pendientes = getattr(self.conexion, "invalidaciones_pendientes", None)
+        if pendientes is not None:
+            pendientes.append(invalidar)
+
+    def _invalidar(self, id_registro):
+        """Descarta de la caché lo que deja de ser válido al modificar un registro."""
+        if self.CACHE is not None:
+            self._descartar(functools.partial(self.CACHE.invalidar, (self.base, id_registro)))
+
+    def listar(self, tamaño_pagina=TAMAÑO_PAGINA):
+        """Genera todos los registros ordenados por id, leyendo por páginas."""
+        return map(self.REGISTRO._make, _iterar_paginado(self.cursor, self.SQL_PAGINA, (), tamaño_pagina))
+
+    def actualizar(self, id_registro, **campos):
+        """
+        Actualiza las columnas indicadas de un registro y retorna True si existía.
+        Lanza ValueError si no hay campos o si alguno no pertenece a la tabla.
+        """
+        if not campos:
+            raise ValueError("No hay campos para actualizar.")
+        desconocidos = set(campos).difference(self.COLUMNAS)
+        if desconocidos:
+            raise ValueError(f"Columnas desconocidas en '{self.TABLA}': {', '.join(sorted(desconocidos))}")
+        # Orden fijo de columnas para que cada combinación tenga un único texto SQL.
+        columnas = tuple(c for c in self.COLUMNAS if c in campos)
+        self.cursor.execute(_sql_actualizar(self.TABLA, columnas), (*(campos[c] for c in columnas), id_registro))
+        self._invalidar(id_registro)
+        self._confirmar()
+        return self.cursor.rowcount > 0
+
+    def eliminar(self, id_registro):
+        """Elimina un registro. Retorna True si existía."""
+        self.cursor.execute(self.SQL_ELIMINAR, (id_registro,))
+        self._invalidar_borrados((id_registro,))
+        self._confirmar()
+        return self.cursor.rowcount > 0
+
+    def eliminar_varios(self, ids):
+        """Elimina los registros con esos ids con un solo commit y retorna cuántos existían."""
+        ids = list(ids)
+        self.cursor.executemany(self.SQL_ELIMINAR, ((id_registro,) for id_registro in ids))
+        eliminados = self.cursor.rowcount
+        self._invalidar_borrados(ids)
+        self._confirmar()
+        return eliminados
+
+    def _invalidar_borrados(self, ids):
+        """Descarta de la caché lo que deja de ser válido al eliminar registros."""
+        for id_registro in ids:
+            self._invalidar(id_registro)
+
+class RepositorioDueños(_Repositorio):
+    """Acceso a la tabla 'Dueños'."""
+    __slots__ = ()
+    TABLA = "Dueños"
+    COLUMNAS = ("nombre", "telefono", "direccion")
+    REGISTRO = Dueño
+    CACHE = CACHE_DUEÑOS
+
+    def _invalidar_borrados(self, ids):
+        ids = set(ids)
+        super()._invalidar_borrados(ids)
+        # El borrado en cascada también elimina las mascotas de esos dueños; una
+        # sola pasada por la caché de mascotas para todos. Actualizar un dueño
+        # no cambia sus mascotas, así que solo se recorre al eliminar.
+        base = self.base
+        self._descartar(functools.partial(
+            CACHE_MASCOTAS.invalidar_si, lambda clave, mascota: clave[0] == base and mascota.id_dueño in ids))
+
+class RepositorioMascotas(_Repositorio):
+    """Acceso a la tabla 'Mascotas'."""
+    __slots__ = ()
+    TABLA = "Mascotas"
+    COLUMNAS = ("nombre", "especie", "raza", "edad", "id_dueño")
+    REGISTRO = Mascota
+    CACHE = CACHE_MASCOTAS
+    SQL_PAGINA_POR_DUEÑO = "SELECT id, nombre, especie, raza, edad, id_dueño FROM Mascotas WHERE id_dueño = ? AND id > ? ORDER BY id LIMIT ?"
+
+    def listar_por_dueño(self, id_dueño, tamaño_pagina=TAMAÑO_PAGINA):
+        """Genera las mascotas de un dueño ordenadas por id."""
+        return map(Mascota._make, _iterar_paginado(self.cursor, self.SQL_PAGINA_POR_DUEÑO, (id_dueño,), tamaño_pagina))
+
+class RepositorioConsultas(_Repositorio):
+    """Acceso a la tabla 'Consultas'."""
+    __slots__ = ()
+    TABLA = "Consultas"
+    COLUMNAS = ("fecha", "motivo", "diagnostico", "id_mascota")
+    REGISTRO = Consulta
+    SQL_PAGINA_POR_MASCOTA = "SELECT id, fecha, motivo, diagnostico, id_mascota FROM Consultas WHERE id_mascota = ? AND id > ? ORDER BY id LIMIT ?"
+    SQL_ELIMINAR_POR_FECHA = "DELETE FROM Consultas WHERE fecha >= ? AND fecha < ?"
+
+    def insertar(self, fecha, motivo, diagnostico, id_mascota):
+        """Inserta una consulta con la fecha normalizada. Lanza ValueError si la fecha no es válida."""
+        return super().insertar(normalizar_fecha(fecha), motivo, diagnostico, id_mascota)
+
+    def actualizar(self, id_registro, **campos):
+        """Actualiza una consulta; si se cambia la fecha, se valida y normaliza."""
+        if campos.get("fecha") is not None:
+            campos["fecha"] = normalizar_fecha(campos["fecha"])
+        return super().actualizar(id_registro, **campos)
+
+    def listar_por_mascota(self, id_mascota, tamaño_pagina=TAMAÑO_PAGINA):
+        """Genera las consultas de una mascota ordenadas por id."""
+        return map(Consulta._make, _iterar_paginado(self.cursor, self.SQL_PAGINA_POR_MASCOTA, (id_mascota,), tamaño_pagina))
+
+    def eliminar_por_fecha(self, desde, hasta):
+        """Elimina las consultas con fecha en [desde, hasta) usando el índice de fecha. Retorna cuántas eran."""
+        self.cursor.execute(self.SQL_ELIMINAR_POR_FECHA, (normalizar_fecha(desde), normalizar_fecha(hasta)))
+        self._confirmar()
+        return self.cursor.rowcount
+
+REPOSITORIOS = {
+    "Dueños": RepositorioDueños,
+    "Mascotas": RepositorioMascotas,
+    "Consultas": RepositorioConsultas,
+}
+
 # --- Funciones de Inserción ---
 
 def insertar_dueño(cursor, conexion, nombre, telefono, direccion):
     """Inserta un nuevo dueño en la tabla 'Dueños'."""
-    sql = "INSERT INTO Dueños (nombre, telefono, direccion) VALUES (?, ?, ?)"
     try:
-        cursor.execute(sql, (nombre, telefono, direccion))
-        conexion.commit()
-        print(f"Dueño '{nombre}' agregado. ID: {cursor.lastrowid}")
-        return cursor.lastrowid
+        id_dueño = RepositorioDueños(conexion, cursor).insertar(nombre, telefono, direccion)
+        print(f"Dueño '{nombre}' agregado. ID: {id_dueño}")
+        return id_dueño
     except sqlite3.Error as e:
         print(f"Error al insertar dueño: {e}")
         return None
 
 def insertar_mascota(cursor, conexion, nombre, especie, raza, edad, id_dueño):
     """Inserta una nueva mascota en la tabla 'Mascotas'."""
-    sql = "INSERT INTO Mascotas (nombre, especie, raza, edad, id_dueño) VALUES (?, ?, ?, ?, ?)"
     try:
-        cursor.execute(sql, (nombre, especie, raza, edad, id_dueño))
-        conexion.commit()
-        print(f"Mascota '{nombre}' agregada. ID: {cursor.lastrowid}")
-        return cursor.lastrowid
+        id_mascota = RepositorioMascotas(conexion, cursor).insertar(nombre, especie, raza, edad, id_dueño)
+        print(f"Mascota '{nombre}' agregada. ID: {id_mascota}")
+        return id_mascota
     except sqlite3.Error as e:
         print(f"Error al insertar mascota: {e}")
         return None
 
 def insertar_consulta(cursor, conexion, fecha, motivo, diagnostico, id_mascota):
     """Inserta una nueva consulta en la tabla 'Consultas'."""
-    sql = "INSERT INTO Consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, ?)"
     try:
-        cursor.execute(sql, (fecha, motivo, diagnostico, id_mascota))
-        conexion.commit()
-        print(f"Consulta para mascota ID {id_mascota} agregada. ID: {cursor.lastrowid}")
-        return cursor.lastrowid
-    except sqlite3.Error as e:
+        id_consulta = RepositorioConsultas(conexion, cursor).insertar(fecha, motivo, diagnostico, id_mascota)
+        print(f"Consulta para mascota ID {id_mascota} agregada. ID: {id_consulta}")
+        return id_consulta
+    except (sqlite3.Error, ValueError) as e:
         print(f"Error al insertar consulta: {e}")
         return None
 
+# --- Importación Masiva ---
+
+TAMAÑO_LOTE_IMPORTACION = 5000
+MAX_DETALLES_RECHAZO = 1000
+
+# Orden en que se vuelcan los lotes: primero los padres y luego los hijos,
+# así las claves foráneas de un mismo lote ya existen al insertar los hijos.
+ORDEN_IMPORTACION = ("Dueños", "Mascotas", "Consultas")
+
+COLUMNAS_IMPORTACION = {
+    "Dueños": ("id", "nombre", "telefono", "direccion"),
+    "Mascotas": ("id", "nombre", "especie", "raza", "edad", "id_dueño"),
+    "Consultas": ("id", "fecha", "motivo", "diagnostico", "id_mascota"),
+}
+CAMPOS_OBLIGATORIOS = {
+    "Dueños": ("nombre",),
+    "Mascotas": ("nombre", "id_dueño"),
+    "Consultas": ("fecha", "motivo", "id_mascota"),
+}
+CAMPOS_ENTEROS = ("id", "edad", "id_dueño", "id_mascota")
+# Tabla hija -> (columna con la clave foránea, tabla padre)
+CLAVES_FORANEAS = {
+    "Mascotas": ("id_dueño", "Dueños"),
+    "Consultas": ("id_mascota", "Mascotas"),
+}
+
+def _sql_ids(tabla):
+    return f"SELECT id FROM {tabla}"
+
+def _leer_filas_importacion(ruta, tabla=None):
+    """
+    Lee un archivo CSV o JSONL y genera tuplas (línea, tabla, fila).
+    Cada fila puede indicar su tabla con la clave 'tabla'; si no, se usa 'tabla'.
+    """
+    if ruta.lower().endswith(".csv"):
+        import csv
+        with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+            # La línea 1 es la cabecera.
+            for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+                yield numero, fila.pop("tabla", None) or tabla, fila
+    else:
+        with open(ruta, encoding="utf-8") as archivo:
+            for numero, linea in enumerate(archivo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError as e:
+                    yield numero, tabla, f"JSON no válido: {e}"
+                    continue
+                if not isinstance(fila, dict):
+                    yield numero, tabla, "Se esperaba un objeto JSON por línea."
+                    continue
+                yield numero, fila.pop("tabla", None) or tabla, fila
+
+def _normalizar_fila_importacion(tabla, fila):
+    """
+    Convierte una fila leída del archivo en la tupla de valores a insertar.
+    Lanza ValueError con el motivo del rechazo si la fila no es válida.
+    """
+    if tabla not in COLUMNAS_IMPORTACION:
+        raise ValueError(f"Tabla desconocida: {tabla!r}")
+    valores = []
+    for columna in COLUMNAS_IMPORTACION[tabla]:
+        valor = fila.get(columna)
+        if isinstance(valor, str):
+            valor = valor.strip() or None
+        if valor is not None and columna in CAMPOS_ENTEROS:
+            try:
+                # int() truncaría 3.7 y aceptaría true; igual que "3.0" en CSV, solo valen enteros.
+                if not isinstance(valor, (int, str)) or isinstance(valor, bool):
+                    raise TypeError(valor)
+                valor = int(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"El campo '{columna}' debe ser un número entero.")
+        if valor is None and columna in CAMPOS_OBLIGATORIOS[tabla]:
+            raise ValueError(f"Falta el campo obligatorio '{columna}'.")
+        if valor is not None and columna == "fecha":
+            valor = normalizar_fecha(valor)
+        valores.append(valor)
+    return tuple(valores)
+
+def _volcar_lote_importacion(cursor, tabla, filas, ids_conocidos, resultado):
+    """
+    Inserta con executemany las filas pendientes de una tabla; si el lote falla, las reintenta
+    una a una dentro de un SAVEPOINT para rechazar solo las problemáticas.
+    """
+    if tabla in CLAVES_FORANEAS:
+        # Un padre del mismo lote pudo ser rechazado al insertarse.
+        columna_fk, tabla_padre = CLAVES_FORANEAS[tabla]
+        posicion_fk = COLUMNAS_IMPORTACION[tabla].index(columna_fk)
+        validas = []
+        for numero, valores in filas:
+            if valores[posicion_fk] in ids_conocidos[tabla_padre]:
+                validas.append((numero, valores))
+            else:
+                _registrar_rechazo(resultado, numero, tabla, f"No existe {columna_fk}={valores[posicion_fk]} en '{tabla_padre}'.")
+        filas = validas
+    if not filas:
+        return
+
+    columnas = COLUMNAS_IMPORTACION[tabla]
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+    cursor.execute("SAVEPOINT importacion")
+    try:
+        cursor.executemany(sql, [valores for _, valores in filas])
+        resultado["insertadas"][tabla] += len(filas)
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK TO importacion")
+        for numero, valores in filas:
+            try:
+                cursor.execute(sql, valores)
+                resultado["insertadas"][tabla] += 1
+            except sqlite3.Error as e:
+                if valores[0] is not None and tabla in ids_conocidos:
+                    ids_conocidos[tabla].discard(valores[0])
+                _registrar_rechazo(resultado, numero, tabla, str(e))
+    cursor.execute("RELEASE importacion")
+
+def _registrar_rechazo(resultado, numero, tabla, motivo):
+    """Cuenta una fila rechazada y guarda su detalle hasta un máximo."""
+    resultado["rechazadas"] += 1
+    if len(resultado["errores"]) < MAX_DETALLES_RECHAZO:
+        resultado["errores"].append((numero, tabla, motivo))
+
+def importar_archivo(cursor, conexion, ruta, tabla=None, tamaño_lote=TAMAÑO_LOTE_IMPORTACION):
+    """
+    Importa Dueños, Mascotas y Consultas desde un CSV o JSONL, con un commit cada 'tamaño_lote' filas.
+    Retorna las filas insertadas por tabla, las rechazadas con su motivo y las filas por segundo.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        "insertadas": dict.fromkeys(ORDEN_IMPORTACION, 0),
+        "rechazadas": 0,
+        "errores": [],
+    }
+    ids_conocidos = {}
+    for tabla_padre in ("Dueños", "Mascotas"):
+        cursor.execute(_sql_ids(tabla_padre))
+        ids_conocidos[tabla_padre] = {fila[0] for fila in cursor}
+
+    pendientes = {t: [] for t in ORDEN_IMPORTACION}
+    total_pendientes = 0
+
+    def volcar():
+        if not conexion.in_transaction:
+            cursor.execute("BEGIN")
+        for t in ORDEN_IMPORTACION:
+            _volcar_lote_importacion(cursor, t, pendientes[t], ids_conocidos, resultado)
+            pendientes[t] = []
+        conexion.commit()
+
+    try:
+        for numero, tabla_fila, fila in _leer_filas_importacion(ruta, tabla):
+            if isinstance(fila, str):
+                _registrar_rechazo(resultado, numero, tabla_fila, fila)
+                continue
+            try:
+                valores = _normalizar_fila_importacion(tabla_fila, fila)
+                if tabla_fila in CLAVES_FORANEAS:
+                    columna_fk, tabla_padre = CLAVES_FORANEAS[tabla_fila]
+                    id_padre = valores[COLUMNAS_IMPORTACION[tabla_fila].index(columna_fk)]
+                    if id_padre not in ids_conocidos[tabla_padre]:
+                        raise ValueError(f"No existe {columna_fk}={id_padre} en '{tabla_padre}'.")
+                if tabla_fila in ids_conocidos and valores[0] is not None:
+                    if valores[0] in ids_conocidos[tabla_fila]:
+                        raise ValueError(f"El id {valores[0]} ya existe en '{tabla_fila}'.")
+                    ids_conocidos[tabla_fila].add(valores[0])
+            except ValueError as e:
+                _registrar_rechazo(resultado, numero, tabla_fila, str(e))
+                continue
+
+            pendientes[tabla_fila].append((numero, valores))
+            total_pendientes += 1
+            if total_pendientes >= tamaño_lote:
+                volcar()
+                total_pendientes = 0
+        volcar()
+    except sqlite3.Error:
+        conexion.rollback()
+        raise
+
+    segundos = time.perf_counter() - inicio
+    total = sum(resultado["insertadas"].values())
+    resultado["segundos"] = segundos
+    resultado["filas_por_segundo"] = total / segundos if segundos > 0 else 0.0
+    return resultado
+
+def mostrar_resultado_importacion(resultado):
+    """Muestra el resumen de una importación masiva."""
+    print("\n--- RESULTADO DE LA IMPORTACIÓN ---")
+    for tabla, cantidad in resultado["insertadas"].items():
+        print(f"{tabla}: {cantidad} filas insertadas")
+    print(f"Filas rechazadas: {resultado['rechazadas']}")
+    for numero, tabla, motivo in resultado["errores"][:20]:
+        print(f"  Línea {numero} ({tabla or 'sin tabla'}): {motivo}")
+    if resultado["rechazadas"] > 20:
+        print(f"  ... y {resultado['rechazadas'] - 20} rechazos más.")
+    print(f"Tiempo: {resultado['segundos']:.2f} s ({resultado['filas_por_segundo']:.0f} filas/s)")
+
+# --- Exportación ---
+
+TAMAÑO_LOTE_EXPORTACION = 5000
+# Formato columnar: MAGIA_COLUMNAR, una cabecera JSON con las columnas y grupos
+# de hasta FILAS_POR_GRUPO_COLUMNAR filas; cada grupo guarda su cantidad de filas
+# y cada columna como lista JSON comprimida con zlib, precedida de su largo. Un
+# grupo de 0 filas cierra el archivo.
+FILAS_POR_GRUPO_COLUMNAR = 65536
+MAGIA_COLUMNAR = b"VETCOL1\n"
+
+# Fuente -> (columnas, consulta). 'historial' es el historial clínico de cada
+# mascota con su dueño; se lee por el índice (id_mascota, fecha), sin ordenar en memoria.
+FUENTES_EXPORTACION = {
+    "Dueños": (COLUMNAS_IMPORTACION["Dueños"], "SELECT id, nombre, telefono, direccion FROM Dueños ORDER BY id"),
+    "Mascotas": (COLUMNAS_IMPORTACION["Mascotas"], "SELECT id, nombre, especie, raza, edad, id_dueño FROM Mascotas ORDER BY id"),
+    "Consultas": (COLUMNAS_IMPORTACION["Consultas"], "SELECT id, fecha, motivo, diagnostico, id_mascota FROM Consultas ORDER BY id"),
+    "historial": (
+        ("id_mascota", "mascota", "especie", "raza", "id_dueño", "dueño", "id_consulta", "fecha", "motivo", "diagnostico"),
+        """
+        SELECT c.id_mascota, m.nombre, m.especie, m.raza, m.id_dueño, d.nombre, c.id, c.fecha, c.motivo, c.diagnostico
+        FROM Consultas c
+        LEFT JOIN Mascotas m ON m.id = c.id_mascota
+        LEFT JOIN Dueños d ON d.id = m.id_dueño
+        ORDER BY c.id_mascota, c.fecha
+        """,
+    ),
+}
+
+def _abrir_salida(ruta, comprimir, binario=False):
+    """Abre el archivo de salida, comprimido con gzip si se indica."""
+    if comprimir:
+        import gzip
+        # Nivel 6: casi la misma compresión que el 9 por defecto, en mucho menos tiempo.
+        return gzip.open(ruta, "wb" if binario else "wt", compresslevel=6,
+                         encoding=None if binario else "utf-8", newline=None if binario else "")
+    return open(ruta, "wb") if binario else open(ruta, "w", encoding="utf-8", newline="")
+
+def _escribir_csv(ruta, columnas, lotes, comprimir):
+    import csv
+    filas = 0
+    with _abrir_salida(ruta, comprimir) as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        for lote in lotes:
+            escritor.writerows(lote)
+            filas += len(lote)
+    return filas
+
+def _escribir_jsonl(ruta, columnas, lotes, comprimir):
+    filas = 0
+    # Un solo codificador: json.dumps con opciones crea uno nuevo en cada llamada.
+    codificar = json.JSONEncoder(ensure_ascii=False).encode
+    with _abrir_salida(ruta, comprimir) as archivo:
+        for lote in lotes:
+            archivo.writelines(codificar(dict(zip(columnas, fila))) + "\n" for fila in lote)
+            filas += len(lote)
+    return filas
+
+def _escribir_columnar(ruta, columnas, lotes, comprimir):
+    """Escribe las filas en el formato columnar; el archivo ya va comprimido, así que 'comprimir' no se usa."""
+    filas = 0
+    with open(ruta, "wb") as archivo:
+        cabecera = json.dumps({"columnas": list(columnas)}, ensure_ascii=False).encode()
+        archivo.write(MAGIA_COLUMNAR + struct.pack(">I", len(cabecera)) + cabecera)
+
+        def volcar(grupo):
+            archivo.write(struct.pack(">I", len(grupo)))
+            for valores in zip(*grupo):
+                bloque = zlib.compress(json.dumps(valores, ensure_ascii=False).encode())
+                archivo.write(struct.pack(">I", len(bloque)) + bloque)
+
+        grupo = []
+        for lote in lotes:
+            grupo.extend(lote)
+            filas += len(lote)
+            if len(grupo) >= FILAS_POR_GRUPO_COLUMNAR:
+                volcar(grupo)
+                grupo = []
+        if grupo:
+            volcar(grupo)
+        archivo.write(struct.pack(">I", 0))
+    return filas
+
+def leer_columnar(ruta, columnas=None):
+    """
+    Genera las filas de un archivo del formato columnar como diccionarios.
+    Con 'columnas' solo se descomprimen y entregan esas columnas.
+    """
+    with open(ruta, "rb") as archivo:
+        if archivo.read(len(MAGIA_COLUMNAR)) != MAGIA_COLUMNAR:
+            raise ValueError(f"{ruta} no es un archivo columnar de la veterinaria.")
+        (largo,) = struct.unpack(">I", archivo.read(4))
+        todas = json.loads(archivo.read(largo))["columnas"]
+        elegidas = set(columnas or todas)
+        desconocidas = elegidas.difference(todas)
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}")
+        while True:
+            (cantidad,) = struct.unpack(">I", archivo.read(4))
+            if cantidad == 0:
+                return
+            valores = {}
+            for columna in todas:
+                (largo,) = struct.unpack(">I", archivo.read(4))
+                if columna in elegidas:
+                    valores[columna] = json.loads(zlib.decompress(archivo.read(largo)))
+                else:
+                    archivo.seek(largo, os.SEEK_CUR)
+            nombres = [columna for columna in todas if columna in elegidas]
+            for fila in zip(*(valores[columna] for columna in nombres)):
+                yield dict(zip(nombres, fila))
+
+# Formato -> (extensión, función de escritura)
+FORMATOS_EXPORTACION = {
+    "csv": (".csv", _escribir_csv),
+    "jsonl": (".jsonl", _escribir_jsonl),
+    "columnar": (".vcol", _escribir_columnar),
+}
+
+def _lotes_cursor(cursor, tamaño_lote):
+    """Genera las filas pendientes de un cursor de a 'tamaño_lote', sin cargarlas todas en memoria."""
+    while True:
+        lote = cursor.fetchmany(tamaño_lote)
+        if not lote:
+            return
+        yield lote
+
+def exportar_datos(conexion, directorio, fuentes=ORDEN_IMPORTACION, formato="csv", comprimir=False,
+                   tamaño_lote=TAMAÑO_LOTE_EXPORTACION):
+    """
+    Exporta las fuentes a archivos en 'directorio' desde una misma foto de la base y retorna fuente -> (ruta, filas).
+    Lanza ValueError si la conexión tiene una transacción abierta.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato desconocido: {formato!r}")
+    desconocidas = set(fuentes).difference(FUENTES_EXPORTACION)
+    if desconocidas:
+        raise ValueError(f"Fuentes desconocidas: {', '.join(sorted(desconocidas))}")
+    extension, escribir = FORMATOS_EXPORTACION[formato]
+    if comprimir and formato != "columnar":
+        extension += ".gz"
+    os.makedirs(directorio, exist_ok=True)
+
+    resultado = {}
+    if conexion.in_transaction:
+        raise ValueError("La conexión tiene una transacción abierta: confírmela o deshágala antes de exportar.")
+    conexion.execute("BEGIN")
+    try:
+        cursor = conexion.cursor()
+        for fuente in fuentes:
+            columnas, sql = FUENTES_EXPORTACION[fuente]
+            ruta = os.path.join(directorio, fuente + extension)
+            cursor.execute(sql)
+            try:
+                filas = escribir(ruta + ".tmp", columnas, _lotes_cursor(cursor, tamaño_lote), comprimir)
+            except BaseException:
+                if os.path.exists(ruta + ".tmp"):
+                    os.remove(ruta + ".tmp")
+                raise
+            os.replace(ruta + ".tmp", ruta)
+            resultado[fuente] = (ruta, filas)
+    finally:
+        conexion.rollback()  # solo se leyó: termina la transacción de lectura
+    return resultado
+
 # --- Funciones de Consulta (Mostrar Datos) ---
 
-def mostrar_dueños(cursor):
-    """Muestra todos los dueños en la base de datos."""
+# Paginación por clave (keyset): cada página continúa desde el último id leído,
+# así el costo de una página no depende de cuántas se hayan leído antes.
+SQL_PAGINA_DUEÑOS = "SELECT id, nombre, telefono, direccion FROM Dueños WHERE id > ? ORDER BY id LIMIT ?"
+# Los listados traen el nombre del dueño o de la mascota con un JOIN: pasar
+# cada fila por la caché desplazaría de ella los registros más consultados.
+SQL_LISTAR_MASCOTAS = "SELECT m.id, m.nombre, m.especie, m.raza, m.edad, d.nombre FROM Mascotas m JOIN Dueños d ON m.id_dueño = d.id"
+SQL_LISTAR_CONSULTAS = "SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre FROM Consultas c JOIN Mascotas m ON c.id_mascota = m.id"
+SQL_PAGINA_MASCOTAS = SQL_LISTAR_MASCOTAS + " WHERE m.id > ? ORDER BY m.id LIMIT ?"
+SQL_PAGINA_MASCOTAS_POR_DUEÑO = SQL_LISTAR_MASCOTAS + " WHERE m.id_dueño = ? AND m.id > ? ORDER BY m.id LIMIT ?"
+SQL_PAGINA_CONSULTAS = SQL_LISTAR_CONSULTAS + " WHERE c.id > ? ORDER BY c.id LIMIT ?"
+SQL_PAGINA_CONSULTAS_POR_MASCOTA = SQL_LISTAR_CONSULTAS + " WHERE c.id_mascota = ? AND c.id > ? ORDER BY c.id LIMIT ?"
+
+def iterar_dueños(cursor, tamaño_pagina=TAMAÑO_PAGINA, despues_de=ID_MINIMO):
+    """Genera los dueños ordenados por id, leyendo la tabla por páginas."""
+    return _iterar_paginado(cursor, SQL_PAGINA_DUEÑOS, (), tamaño_pagina, despues_de)
+
+def iterar_mascotas(cursor, id_dueño=None, tamaño_pagina=TAMAÑO_PAGINA, despues_de=ID_MINIMO):
+    """
+    Genera las mascotas ordenadas por id, opcionalmente filtradas por id_dueño.
+    La última columna es el nombre del dueño.
+    """
+    if id_dueño:
+        return _iterar_paginado(cursor, SQL_PAGINA_MASCOTAS_POR_DUEÑO, (id_dueño,), tamaño_pagina, despues_de)
+    return _iterar_paginado(cursor, SQL_PAGINA_MASCOTAS, (), tamaño_pagina, despues_de)
+
+def iterar_consultas(cursor, id_mascota=None, tamaño_pagina=TAMAÑO_PAGINA, despues_de=ID_MINIMO):
+    """
+    Genera las consultas ordenadas por id, opcionalmente filtradas por id_mascota.
+    La última columna es el nombre de la mascota.
+    """
+    if id_mascota:
+        return _iterar_paginado(cursor, SQL_PAGINA_CONSULTAS_POR_MASCOTA, (id_mascota,), tamaño_pagina, despues_de)
+    return _iterar_paginado(cursor, SQL_PAGINA_CONSULTAS, (), tamaño_pagina, despues_de)
+
+def _mostrar_paginado(filas, formatear, tamaño_pagina, continuar):
+    """
+    Imprime las filas página a página, deteniéndose si continuar() retorna False antes de una página nueva.
+    Retorna la cantidad de filas mostradas.
+    """
+    mostradas = 0
+    for fila in filas:
+        if mostradas and mostradas % tamaño_pagina == 0 and continuar and not continuar():
+            break
+        print(formatear(fila))
+        mostradas += 1
+    return mostradas
+
+def mostrar_dueños(cursor, tamaño_pagina=TAMAÑO_PAGINA, continuar=None):
+    """Muestra todos los dueños en la base de datos. Retorna cuántos se mostraron."""
     print("\n--- LISTADO DE DUEÑOS ---")
-    cursor.execute("SELECT id, nombre, telefono, direccion FROM Dueños")
-    dueños = cursor.fetchall()
-    if dueños:
-        for d in dueños:
-            print(f"ID: {d[0]}, Nombre: {d[1]}, Teléfono: {d[2] or 'N/A'}, Dirección: {d[3] or 'N/A'}")
-    else:
+    mostrados = _mostrar_paginado(
+        iterar_dueños(cursor, tamaño_pagina),
+        lambda d: f"ID: {d[0]}, Nombre: {d[1]}, Teléfono: {d[2] or 'N/A'}, Dirección: {d[3] or 'N/A'}",
+        tamaño_pagina, continuar)
+    if not mostrados:
         print("No hay dueños registrados.")
-    return dueños
+    return mostrados
 
-def mostrar_mascotas(cursor, id_dueño=None):
-    """Muestra todas las mascotas, opcionalmente filtradas por id_dueño."""
+def mostrar_mascotas(cursor, id_dueño=None, tamaño_pagina=TAMAÑO_PAGINA, continuar=None):
+    """Muestra todas las mascotas, opcionalmente filtradas por id_dueño. Retorna cuántas se mostraron."""
     print("\n--- LISTADO DE MASCOTAS ---")
-    if id_dueño:
-        sql = "SELECT m.id, m.nombre, m.especie, m.raza, m.edad, d.nombre FROM Mascotas m JOIN Dueños d ON m.id_dueño = d.id WHERE m.id_dueño = ?"
-        cursor.execute(sql, (id_dueño,))
-    else:
-        sql = "SELECT m.id, m.nombre, m.especie, m.raza, m.edad, d.nombre FROM Mascotas m JOIN Dueños d ON m.id_dueño = d.id"
-        cursor.execute(sql)
-    mascotas = cursor.fetchall()
-    if mascotas:
-        for m in mascotas:
-            print(f"ID: {m[0]}, Nombre: {m[1]}, Especie: {m[2]}, Raza: {m[3] or 'N/A'}, Edad: {m[4] or 'N/A'} años, Dueño: {m[5]}")
-    else:
+    mostradas = _mostrar_paginado(
+        iterar_mascotas(cursor, id_dueño, tamaño_pagina),
+        lambda m: f"ID: {m[0]}, Nombre: {m[1]}, Especie: {m[2]}, Raza: {m[3] or 'N/A'}, Edad: {m[4] or 'N/A'} años, Dueño: {m[5]}",
+        tamaño_pagina, continuar)
+    if not mostradas:
         print("No hay mascotas registradas." if not id_dueño else f"No hay mascotas para el Dueño ID {id_dueño}.")
-    return mascotas
+    return mostradas
 
-def mostrar_consultas(cursor, id_mascota=None):
-    """Muestra todas las consultas, opcionalmente filtradas por id_mascota."""
+def mostrar_consultas(cursor, id_mascota=None, tamaño_pagina=TAMAÑO_PAGINA, continuar=None):
+    """Muestra todas las consultas, opcionalmente filtradas por id_mascota. Retorna cuántas se mostraron."""
     print("\n--- LISTADO DE CONSULTAS ---")
-    if id_mascota:
-        sql = "SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre FROM Consultas c JOIN Mascotas m ON c.id_mascota = m.id WHERE c.id_mascota = ?"
-        cursor.execute(sql, (id_mascota,))
-    else:
-        sql = "SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre FROM Consultas c JOIN Mascotas m ON c.id_mascota = m.id"
-        cursor.execute(sql)
-    consultas = cursor.fetchall()
-    if consultas:
-        for c in consultas:
-            print(f"ID: {c[0]}, Fecha: {c[1]}, Mascota: {c[4]}, Motivo: {c[2]}, Diagnóstico: {c[3] or 'N/A'}")
-    else:
+    mostradas = _mostrar_paginado(
+        iterar_consultas(cursor, id_mascota, tamaño_pagina),
+        lambda c: f"ID: {c[0]}, Fecha: {c[1]}, Mascota: {c[4]}, Motivo: {c[2]}, Diagnóstico: {c[3] or 'N/A'}",
+        tamaño_pagina, continuar)
+    if not mostradas:
         print("No hay consultas registradas." if not id_mascota else f"No hay consultas para la Mascota ID {id_mascota}.")
-    return consultas
+    return mostradas
+
+# --- Búsqueda de Texto en Consultas ---
+
+LIMITE_BUSQUEDA = 50
+
+SQL_BUSCAR_CONSULTAS = """
+    SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre
+    FROM ConsultasFTS f JOIN Consultas c ON c.id = f.rowid JOIN Mascotas m ON m.id = c.id_mascota
+    WHERE ConsultasFTS MATCH ? AND c.fecha >= ? AND c.fecha < ?
+    ORDER BY f.rank
+    LIMIT ?
+    """
+# Cotas de fecha que no filtran nada: cualquier texto es >= '' y < '\uffff'.
+FECHA_MINIMA = ""
+FECHA_MAXIMA = "\uffff"
+
+def expresion_busqueda(texto):
+    """
+    Convierte el texto del usuario en una expresión FTS5 que exige cada palabra, citada para que '-' o ':'
+    no se lean como operadores.
+    """
+    palabras = texto.split()
+    if not palabras:
+        raise ValueError("El texto de búsqueda está vacío.")
+    return " ".join('"' + palabra.replace('"', '""') + '"' for palabra in palabras)
+
+def buscar_consultas(cursor, texto, desde=None, hasta=None, limite=LIMITE_BUSQUEDA):
+    """
+    Busca consultas con todas las palabras de 'texto' en el motivo o el diagnóstico, opcionalmente en [desde, hasta).
+    Retorna hasta 'limite' filas (id, fecha, motivo, diagnóstico, mascota), de la más a la menos relevante.
+    """
+    desde = normalizar_fecha(desde) if desde else FECHA_MINIMA
+    hasta = normalizar_fecha(hasta) if hasta else FECHA_MAXIMA
+    cursor.execute(SQL_BUSCAR_CONSULTAS, (expresion_busqueda(texto), desde, hasta, limite))
+    return cursor.fetchall()
+
+def mostrar_busqueda_consultas(cursor, texto, desde=None, hasta=None, limite=LIMITE_BUSQUEDA):
+    """Muestra el resultado de buscar_consultas. Retorna cuántas consultas se encontraron."""
+    print(f"\n--- CONSULTAS QUE COINCIDEN CON '{texto}' ---")
+    try:
+        consultas = buscar_consultas(cursor, texto, desde, hasta, limite)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Error en la búsqueda: {e}")
+        return 0
+    for c in consultas:
+        print(f"ID: {c[0]}, Fecha: {c[1]}, Mascota: {c[4]}, Motivo: {c[2]}, Diagnóstico: {c[3] or 'N/A'}")
+    if not consultas:
+        print("No se encontraron consultas.")
+    return len(consultas)
+
+def reconstruir_indice_busqueda(conexion):
+    """Regenera y compacta el índice de texto completo a partir de la tabla Consultas."""
+    conexion.execute("INSERT INTO ConsultasFTS (ConsultasFTS) VALUES ('rebuild')")
+    conexion.execute("INSERT INTO ConsultasFTS (ConsultasFTS) VALUES ('optimize')")
+    conexion.commit()
+
+# --- Agenda de Consultas ---
+
+# Paginación por (fecha, id) sobre el índice de fecha: cada página es un
+# recorrido por rango del índice que continúa donde terminó la anterior.
+SQL_PAGINA_AGENDA = """
+    SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre
+    FROM Consultas c JOIN Mascotas m ON m.id = c.id_mascota
+    WHERE (c.fecha, c.id) > (?, ?) AND c.fecha < ?
+    ORDER BY c.fecha, c.id
+    LIMIT ?
+    """
+SQL_ULTIMAS_VISITAS = """
+    SELECT c.id, c.fecha, c.motivo, c.diagnostico, m.nombre
+    FROM Consultas c JOIN Mascotas m ON m.id = c.id_mascota
+    WHERE c.id_mascota = ?
+    ORDER BY c.fecha DESC
+    LIMIT ?
+    """
+
+def agenda(cursor, desde, hasta, tamaño_pagina=TAMAÑO_PAGINA):
+    """
+    Genera las consultas con fecha en [desde, hasta), en orden cronológico.
+    Cada fila es (id, fecha, motivo, diagnóstico, nombre de la mascota).
+    """
+    desde = normalizar_fecha(desde)
+    hasta = normalizar_fecha(hasta)
+    # El primer elemento de la clave es 'desde' con un id menor que cualquiera,
+    # para incluir las consultas que ocurren justo en 'desde'.
+    ultima_fecha, ultimo_id = desde, ID_MINIMO
+
+    def filas():
+        nonlocal ultima_fecha, ultimo_id
+        while True:
+            cursor.execute(SQL_PAGINA_AGENDA, (ultima_fecha, ultimo_id, hasta, tamaño_pagina))
+            pagina = cursor.fetchall()
+            yield from pagina
+            if len(pagina) < tamaño_pagina:
+                return
+            ultimo_id, ultima_fecha = pagina[-1][0], pagina[-1][1]
+
+    return filas()
+
+def agenda_dia(cursor, dia=None, tamaño_pagina=TAMAÑO_PAGINA):
+    """Genera las consultas de un día (hoy por defecto) en orden cronológico."""
+    dia = datetime.strptime(normalizar_fecha(dia or date.today()), FORMATO_FECHA).date()
+    return agenda(cursor, dia, dia + timedelta(days=1), tamaño_pagina)
+
+def agenda_semana(cursor, dia=None, tamaño_pagina=TAMAÑO_PAGINA):
+    """Genera las consultas de la semana (lunes a domingo) que contiene 'dia'."""
+    dia = datetime.strptime(normalizar_fecha(dia or date.today()), FORMATO_FECHA).date()
+    lunes = dia - timedelta(days=dia.weekday())
+    return agenda(cursor, lunes, lunes + timedelta(days=7), tamaño_pagina)
+
+def ultimas_visitas(cursor, id_mascota, cantidad=5):
+    """Retorna las últimas 'cantidad' consultas de una mascota, de la más reciente a la más antigua."""
+    cursor.execute(SQL_ULTIMAS_VISITAS, (id_mascota, cantidad))
+    return cursor.fetchall()
+
+def mostrar_agenda(cursor, consultas, titulo, tamaño_pagina=TAMAÑO_PAGINA, continuar=None):
+    """Muestra página a página una agenda de consultas. Retorna cuántas se mostraron."""
+    print(f"\n--- {titulo} ---")
+    mostradas = _mostrar_paginado(
+        consultas,
+        lambda c: f"{c[1]}  Mascota: {c[4]}, Motivo: {c[2]}, Diagnóstico: {c[3] or 'N/A'} (Consulta ID: {c[0]})",
+        tamaño_pagina, continuar)
+    if not mostradas:
+        print("No hay consultas en ese período.")
+    return mostradas
 
 # --- Funciones de Actualización ---
 
 def actualizar_dueño(cursor, conexion, id_dueño, nombre=None, telefono=None, direccion=None):
     """Actualiza los datos de un dueño existente."""
-    sets = []
-    params = []
-    if nombre is not None:
-        sets.append("nombre = ?")
-        params.append(nombre)
-    if telefono is not None:
-        sets.append("telefono = ?")
-        params.append(telefono)
-    if direccion is not None:
-        sets.append("direccion = ?")
-        params.append(direccion)
-
-    if not sets:
+    campos = {"nombre": nombre, "telefono": telefono, "direccion": direccion}
+    campos = {columna: valor for columna, valor in campos.items() if valor is not None}
+    if not campos:
         print("No hay campos para actualizar.")
         return False
 
-    sql = f"UPDATE Dueños SET {', '.join(sets)} WHERE id = ?"
-    params.append(id_dueño)
     try:
-        cursor.execute(sql, tuple(params))
-        conexion.commit()
-        if cursor.rowcount > 0:
+        if RepositorioDueños(conexion, cursor).actualizar(id_dueño, **campos):
             print(f"Dueño ID {id_dueño} actualizado exitosamente.")
             return True
         else:
@@ -187,34 +1508,14 @@ def actualizar_dueño(cursor, conexion, id_dueño, nombre=None, telefono=None, d
 
 def actualizar_mascota(cursor, conexion, id_mascota, nombre=None, especie=None, raza=None, edad=None, id_dueño=None):
     """Actualiza los datos de una mascota existente."""
-    sets = []
-    params = []
-    if nombre is not None:
-        sets.append("nombre = ?")
-        params.append(nombre)
-    if especie is not None:
-        sets.append("especie = ?")
-        params.append(especie)
-    if raza is not None:
-        sets.append("raza = ?")
-        params.append(raza)
-    if edad is not None:
-        sets.append("edad = ?")
-        params.append(edad)
-    if id_dueño is not None:
-        sets.append("id_dueño = ?")
-        params.append(id_dueño)
-
-    if not sets:
+    campos = {"nombre": nombre, "especie": especie, "raza": raza, "edad": edad, "id_dueño": id_dueño}
+    campos = {columna: valor for columna, valor in campos.items() if valor is not None}
+    if not campos:
         print("No hay campos para actualizar.")
         return False
 
-    sql = f"UPDATE Mascotas SET {', '.join(sets)} WHERE id = ?"
-    params.append(id_mascota)
     try:
-        cursor.execute(sql, tuple(params))
-        conexion.commit()
-        if cursor.rowcount > 0:
+        if RepositorioMascotas(conexion, cursor).actualizar(id_mascota, **campos):
             print(f"Mascota ID {id_mascota} actualizada exitosamente.")
             return True
         else:
@@ -226,37 +1527,20 @@ def actualizar_mascota(cursor, conexion, id_mascota, nombre=None, especie=None,
 
 def actualizar_consulta(cursor, conexion, id_consulta, fecha=None, motivo=None, diagnostico=None, id_mascota=None):
     """Actualiza los datos de una consulta existente."""
-    sets = []
-    params = []
-    if fecha is not None:
-        sets.append("fecha = ?")
-        params.append(fecha)
-    if motivo is not None:
-        sets.append("motivo = ?")
-        params.append(motivo)
-    if diagnostico is not None:
-        sets.append("diagnostico = ?")
-        params.append(diagnostico)
-    if id_mascota is not None:
-        sets.append("id_mascota = ?")
-        params.append(id_mascota)
-
-    if not sets:
+    campos = {"fecha": fecha, "motivo": motivo, "diagnostico": diagnostico, "id_mascota": id_mascota}
+    campos = {columna: valor for columna, valor in campos.items() if valor is not None}
+    if not campos:
         print("No hay campos para actualizar.")
         return False
 
-    sql = f"UPDATE Consultas SET {', '.join(sets)} WHERE id = ?"
-    params.append(id_consulta)
     try:
-        cursor.execute(sql, tuple(params))
-        conexion.commit()
-        if cursor.rowcount > 0:
+        if RepositorioConsultas(conexion, cursor).actualizar(id_consulta, **campos):
             print(f"Consulta ID {id_consulta} actualizada exitosamente.")
             return True
         else:
             print(f"No se encontró la Consulta ID {id_consulta}.")
             return False
-    except sqlite3.Error as e:
+    except (sqlite3.Error, ValueError) as e:
         print(f"Error al actualizar consulta: {e}")
         return False
 
@@ -264,11 +1548,10 @@ def actualizar_consulta(cursor, conexion, id_consulta, fecha=None, motivo=None,
 
 def eliminar_registro(cursor, conexion, tabla, id_registro):
     """Función genérica para eliminar un registro de cualquier tabla."""
-    sql = f"DELETE FROM {tabla} WHERE id = ?"
     try:
-        cursor.execute(sql, (id_registro,))
-        conexion.commit()
-        if cursor.rowcount > 0:
+        if tabla not in REPOSITORIOS:
+            raise sqlite3.OperationalError(f"no such table: {tabla}")
+        if REPOSITORIOS[tabla](conexion, cursor).eliminar(id_registro):
             print(f"Registro ID {id_registro} eliminado de la tabla '{tabla}' exitosamente.")
             return True
         else:
@@ -278,26 +1561,789 @@ def eliminar_registro(cursor, conexion, tabla, id_registro):
         print(f"Error al eliminar registro de {tabla}: {e}")
         return False
 
+def eliminar_registros(cursor, conexion, tabla, ids):
+    """Elimina varios registros de una tabla, con sus dependientes en cascada, y retorna cuántos eran."""
+    try:
+        if tabla not in REPOSITORIOS:
+            raise sqlite3.OperationalError(f"no such table: {tabla}")
+        eliminados = REPOSITORIOS[tabla](conexion, cursor).eliminar_varios(ids)
+        print(f"{eliminados} registros eliminados de la tabla '{tabla}'.")
+        return eliminados
+    except sqlite3.Error as e:
+        conexion.rollback()
+        print(f"Error al eliminar registros de {tabla}: {e}")
+        return 0
+
+def eliminar_consultas_entre(cursor, conexion, desde, hasta):
+    """Elimina las consultas con fecha en [desde, hasta) y retorna cuántas eran."""
+    try:
+        eliminadas = RepositorioConsultas(conexion, cursor).eliminar_por_fecha(desde, hasta)
+        print(f"{eliminadas} consultas eliminadas entre {desde} y {hasta}.")
+        return eliminadas
+    except (sqlite3.Error, ValueError) as e:
+        conexion.rollback()
+        print(f"Error al eliminar consultas: {e}")
+        return 0
+
+# --- Mantenimiento ---
+
+# Registros cuyo padre ya no existe, p. ej. los que dejaron los borrados hechos
+# antes de activar las claves foráneas. Primero las consultas (también las de
+# mascotas huérfanas), luego las mascotas.
+SQL_ELIMINAR_CONSULTAS_HUERFANAS = """
+    DELETE FROM Consultas
+    WHERE id_mascota IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM Mascotas m
+        WHERE m.id = Consultas.id_mascota
+          AND (m.id_dueño IS NULL OR EXISTS (SELECT 1 FROM Dueños d WHERE d.id = m.id_dueño))
+    )
+    """
+SQL_ELIMINAR_MASCOTAS_HUERFANAS = """
+    DELETE FROM Mascotas
+    WHERE id_dueño IS NOT NULL AND NOT EXISTS (SELECT 1 FROM Dueños d WHERE d.id = Mascotas.id_dueño)
+    """
+
+def limpiar_huerfanos(conexion):
+    """Elimina las mascotas sin dueño y las consultas sin mascota. Retorna {"Mascotas": n, "Consultas": n}."""
+    try:
+        consultas = conexion.execute(SQL_ELIMINAR_CONSULTAS_HUERFANAS).rowcount
+        mascotas = conexion.execute(SQL_ELIMINAR_MASCOTAS_HUERFANAS).rowcount
+        conexion.commit()
+    except sqlite3.Error:
+        conexion.rollback()
+        raise
+    if mascotas:
+        CACHE_MASCOTAS.limpiar()
+    return {"Mascotas": mascotas, "Consultas": consultas}
+
+def _tamaño_base_datos(conexion):
+    return conexion.execute("PRAGMA page_count").fetchone()[0] * conexion.execute("PRAGMA page_size").fetchone()[0]
+
+def mantenimiento(conexion, vacuum=True):
+    """
+    Elimina los huérfanos, ejecuta ANALYZE y, si se indica, VACUUM y vacía el WAL.
+    Retorna los huérfanos eliminados, el tamaño antes y después (en bytes) y la duración.
+    """
+    inicio = time.perf_counter()
+    tamaño_inicial = _tamaño_base_datos(conexion)
+    huerfanos = limpiar_huerfanos(conexion)
+    conexion.execute("ANALYZE")
+    conexion.commit()
+    if vacuum:
+        conexion.execute("VACUUM")
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {
+        "huerfanos": huerfanos,
+        "bytes_antes": tamaño_inicial,
+        "bytes_despues": _tamaño_base_datos(conexion),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+def mostrar_mantenimiento(resultado):
+    """Muestra el resumen de un mantenimiento."""
+    print("\n--- MANTENIMIENTO ---")
+    for tabla, cantidad in resultado["huerfanos"].items():
+        print(f"{tabla} huérfanas eliminadas: {cantidad}")
+    print(f"Tamaño: {resultado['bytes_antes'] / 1024:.0f} KiB -> {resultado['bytes_despues'] / 1024:.0f} KiB")
+    print(f"Tiempo: {resultado['segundos']:.2f} s")
+
+# --- Sincronización entre Clínicas ---
+
+TAMAÑO_LOTE_SINCRONIZACION = 1000
+
+def _sql_upsert(tabla):
+    columnas = COLUMNAS_IMPORTACION[tabla]
+    return (f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columnas[1:])}")
+
+def _sql_cambios_actualizados(tabla):
+    """Filas actuales de 'tabla' con cambios en un rango de secuencias (tabla, desde, hasta)."""
+    columnas = ", ".join(f"t.{c}" for c in COLUMNAS_IMPORTACION[tabla])
+    return f"""
+        SELECT {columnas} FROM {tabla} t
+        WHERE t.id IN (SELECT id FROM Cambios WHERE tabla = ? AND seq > ? AND seq <= ?)
+        ORDER BY t.id
+        """
+
+def _sql_cambios_eliminados(tabla):
+    """Ids de 'tabla' con cambios en un rango de secuencias que ya no existen."""
+    return f"""
+        SELECT DISTINCT c.id FROM Cambios c
+        WHERE c.tabla = ? AND c.seq > ? AND c.seq <= ?
+          AND NOT EXISTS (SELECT 1 FROM {tabla} t WHERE t.id = c.id)
+        """
+
+SQL_NODO = "SELECT id FROM Nodo"
+SQL_ULTIMA_SECUENCIA = "SELECT coalesce(max(seq), 0) FROM Cambios"
+SQL_SECUENCIA_APLICADA = "SELECT ultimo_seq FROM Sincronizacion WHERE origen = ?"
+SQL_GUARDAR_SECUENCIA = ("INSERT INTO Sincronizacion (origen, ultimo_seq) VALUES (?, ?) "
+                         "ON CONFLICT(origen) DO UPDATE SET ultimo_seq = excluded.ultimo_seq")
+SQL_PODAR_CAMBIOS = "DELETE FROM Cambios WHERE seq <= ?"
+
+def _desplazar(tabla, fila, desplazamiento):
+    """Suma 'desplazamiento' al id y a la clave foránea de una fila (id primero, clave foránea al final)."""
+    if not desplazamiento:
+        return fila
+    fila = list(fila)
+    fila[0] += desplazamiento
+    if tabla in CLAVES_FORANEAS and fila[-1] is not None:
+        fila[-1] += desplazamiento
+    return fila
+
+def _volcar_lotes(destino, sql, filas, tamaño_lote):
+    """Aplica 'sql' a las filas con executemany, una transacción por lote. Retorna cuántas filas fueron."""
+    total = 0
+    while True:
+        lote = list(itertools.islice(filas, tamaño_lote))
+        if not lote:
+            return total
+        try:
+            destino.executemany(sql, lote)
+            destino.commit()
+        except sqlite3.Error:
+            destino.rollback()
+            raise
+        total += len(lote)
+
+def _aplicar_cambios(origen, destino, nodo, desde, hasta, resultado, tamaño_lote, desplazamiento):
+    """Aplica en el destino los cambios (desde, hasta] del origen y guarda 'hasta' como última secuencia."""
+    for tabla in TABLAS_REGISTRADAS:
+        filas = origen.execute(_sql_cambios_actualizados(tabla), (tabla, desde, hasta))
+        resultado["actualizados"][tabla] = _volcar_lotes(
+            destino, _sql_upsert(tabla), (_desplazar(tabla, f, desplazamiento) for f in filas), tamaño_lote)
+
+    for tabla in reversed(TABLAS_REGISTRADAS):
+        ids = origen.execute(_sql_cambios_eliminados(tabla), (tabla, desde, hasta))
+        resultado["eliminados"][tabla] = _volcar_lotes(
+            destino, REPOSITORIOS[tabla].SQL_ELIMINAR, ((id_registro + desplazamiento,) for (id_registro,) in ids), tamaño_lote)
+
+    # Recién al final: si algo falla antes, la próxima vez se reenvía el rango (UPSERT y DELETE son idempotentes).
+    destino.execute(SQL_GUARDAR_SECUENCIA, (nodo, hasta))
+    destino.commit()
+
+def sincronizar(origen, destino, tamaño_lote=TAMAÑO_LOTE_SINCRONIZACION, desplazamiento=0, podar=False):
+    """
+    Envía a 'destino' los cambios de 'origen' desde la última sincronización y retorna lo aplicado.
+    Lanza ValueError si alguna de las dos conexiones tiene una transacción abierta.
+    """
+    if origen.in_transaction or destino.in_transaction:
+        raise ValueError("Hay una transacción abierta: confírmela o deshágala antes de sincronizar.")
+    origen.execute("BEGIN")
+    try:
+        nodo = origen.execute(SQL_NODO).fetchone()[0]
+        fila = destino.execute(SQL_SECUENCIA_APLICADA, (nodo,)).fetchone()
+        desde = fila[0] if fila else 0
+        # Tras podar, el registro puede quedar vacío: nunca se retrocede.
+        hasta = max(desde, origen.execute(SQL_ULTIMA_SECUENCIA).fetchone()[0])
+        resultado = {"origen": nodo, "desde": desde, "hasta": hasta, "actualizados": {}, "eliminados": {}}
+        if hasta > desde:
+            _aplicar_cambios(origen, destino, nodo, desde, hasta, resultado, tamaño_lote, desplazamiento)
+    finally:
+        origen.rollback()  # fin de la transacción de lectura
+    if podar:
+        origen.execute(SQL_PODAR_CAMBIOS, (hasta,))
+        origen.commit()
+    # La caché es del proceso y pudo guardar registros del destino.
+    limpiar_cache()
+    return resultado
+
+def renovar_nodo(conexion):
+    """Da a la base un id de nodo nuevo y rehace su registro de cambios con todos los registros, como al restaurar."""
+    try:
+        conexion.execute("BEGIN")
+        conexion.execute("UPDATE Nodo SET id = lower(hex(randomblob(16)))")
+        conexion.execute("DELETE FROM Cambios")
+        for sql in SQL_SEMBRAR_CAMBIOS:
+            conexion.execute(sql)
+        conexion.commit()
+    except sqlite3.Error:
+        conexion.rollback()
+        raise
+
+def mostrar_resultado_sincronizacion(resultado):
+    """Muestra el resumen de una sincronización."""
+    print("\n--- SINCRONIZACIÓN ---")
+    if resultado["hasta"] <= resultado["desde"]:
+        print(f"Origen {resultado['origen']}: no hay cambios nuevos.")
+        return
+    print(f"Origen {resultado['origen']}: cambios {resultado['desde'] + 1} a {resultado['hasta']}")
+    for tabla in TABLAS_REGISTRADAS:
+        print(f"{tabla}: {resultado['actualizados'][tabla]} insertados o actualizados, "
+              f"{resultado['eliminados'][tabla]} eliminados")
+
+# --- Copias de Seguridad ---
+
+PAGINAS_POR_PASO = 256        # páginas copiadas por paso de la API de backup
+PAUSA_ENTRE_PASOS = 0.005     # segundos sin bloqueo entre pasos, para no frenar a la clínica
+MAX_REINICIOS_RESPALDO = 3    # reinicios por escrituras ajenas antes de copiar en un solo paso
+DIRECTORIO_RESPALDOS = "respaldos"
+
+class _DemasiadosReinicios(Exception):
+    """La copia por pasos se reinició demasiadas veces por escrituras concurrentes."""
+
+def verificar_integridad(conexion):
+    """
+    Ejecuta PRAGMA integrity_check y foreign_key_check. Retorna la lista de
+    problemas encontrados; vacía si la base de datos está sana.
+    """
+    problemas = [fila[0] for fila in conexion.execute("PRAGMA integrity_check") if fila[0] != "ok"]
+    problemas += [f"Clave foránea rota: {tabla} fila {fila} -> {padre}"
+                  for tabla, fila, padre, _ in conexion.execute("PRAGMA foreign_key_check")]
+    return problemas
+
+def respaldar(conexion, destino, paginas=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS):
+    """
+    Copia la base en 'destino' con el backup en línea de SQLite, de a 'paginas' por paso, y verifica la copia.
+    Retorna la ruta, las páginas, los pasos, los reinicios y la duración.
+    """
+    inicio = time.perf_counter()
+    temporal = destino + ".tmp"
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(temporal + sufijo):
+            os.remove(temporal + sufijo)
+    estado = {"pasos": 0, "reinicios": 0, "restantes": None, "paginas": 0}
+
+    def progreso(_, restantes, total):
+        if estado["restantes"] is not None and restantes > estado["restantes"]:
+            estado["reinicios"] += 1
+            if estado["reinicios"] > MAX_REINICIOS_RESPALDO:
+                raise _DemasiadosReinicios()
+        estado.update(pasos=estado["pasos"] + 1, restantes=restantes, paginas=total)
+        if restantes:
+            time.sleep(pausa)
+
+    copia = _conectar_copia(temporal)
+    try:
+        try:
+            conexion.backup(copia, pages=paginas, progress=progreso)
+        except _DemasiadosReinicios:
+            conexion.backup(copia)
+            estado["pasos"] += 1
+        problemas = verificar_integridad(copia)
+        if problemas:
+            raise sqlite3.DatabaseError(f"La copia no pasó la verificación de integridad: {problemas[0]}")
+        # La copia queda autocontenida en un único archivo, sin -wal.
+        copia.execute("PRAGMA journal_mode = DELETE")
+    except BaseException:
+        copia.close()
+        os.remove(temporal)
+        raise
+    copia.close()
+    os.replace(temporal, destino)
+    return {
+        "ruta": destino,
+        "paginas": estado["paginas"],
+        "pasos": estado["pasos"],
+        "reinicios": estado["reinicios"],
+        "segundos": time.perf_counter() - inicio,
+    }
+
+def restaurar(respaldo, ruta=DB_NAME, config=None):
+    """
+    Reemplaza la base 'ruta' por la copia 'respaldo', verificada y migrada, como un nodo nuevo de sincronización.
+    Retorna la ruta donde quedó el contenido anterior, o None si no había base.
+    """
+    if not os.path.exists(respaldo):
+        raise FileNotFoundError(f"No existe la copia de seguridad: {respaldo}")
+    origen = _conectar_copia(respaldo)
+    try:
+        problemas = verificar_integridad(origen)
+        if problemas:
+            raise sqlite3.DatabaseError(f"La copia no pasó la verificación de integridad: {problemas[0]}")
+        anterior = None
+        # Se mira antes de conectar: conectar() crea el archivo y lo pasa a modo WAL.
+        habia_base = os.path.exists(ruta) and os.path.getsize(ruta) > 0
+        conexion = conectar(ruta, config)
+        try:
+            if habia_base:
+                anterior = respaldar(conexion, ruta + ".antes-de-restaurar")["ruta"]
+            origen.backup(conexion)
+            migrar_esquema(conexion)
+            renovar_nodo(conexion)
+        finally:
+            conexion.close()
+    finally:
+        origen.close()
+    limpiar_cache()
+    return anterior
+
+class RespaldoPeriodico(threading.Thread):
+    """Hilo que hace una copia cada 'intervalo' segundos en 'directorio' y conserva las 'conservar' más recientes."""
+
+    def __init__(self, ruta=DB_NAME, directorio=DIRECTORIO_RESPALDOS, intervalo=3600.0, conservar=24,
+                 config=None, inmediato=False):
+        super().__init__(name="respaldo-periodico", daemon=True)
+        self.ruta = ruta
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.conservar = conservar
+        self.config = config
+        self.inmediato = inmediato
+        self.ultimo = None        # resultado de la última copia
+        self.ultimo_error = None  # excepción de la última copia fallida
+        self._detener = threading.Event()
+
+    def respaldar_ahora(self):
+        """Hace una copia y descarta las más antiguas. Retorna el resultado de respaldar()."""
+        os.makedirs(self.directorio, exist_ok=True)
+        prefijo = os.path.splitext(os.path.basename(self.ruta))[0] + "-"
+        destino = os.path.join(self.directorio, f"{prefijo}{datetime.now():%Y%m%d-%H%M%S}.db")
+        conexion = conectar(self.ruta, self.config)
+        try:
+            self.ultimo = respaldar(conexion, destino)
+        finally:
+            conexion.close()
+        # Los nombres llevan la fecha, así que el orden alfabético es el cronológico.
+        copias = sorted(nombre for nombre in os.listdir(self.directorio)
+                        if nombre.startswith(prefijo) and nombre.endswith(".db"))
+        for nombre in copias[:max(0, len(copias) - self.conservar)]:
+            os.remove(os.path.join(self.directorio, nombre))
+        return self.ultimo
+
+    def run(self):
+        if not self.inmediato and self._detener.wait(self.intervalo):
+            return
+        while True:
+            try:
+                self.respaldar_ahora()
+                self.ultimo_error = None
+            except (sqlite3.Error, OSError) as e:
+                self.ultimo_error = e
+            if self._detener.wait(self.intervalo):
+                return
+
+    def detener(self):
+        """Pide al hilo que termine (tras la copia en curso, si la hay) y lo espera."""
+        self._detener.set()
+        self.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detener()
+
+# --- Pool de Conexiones ---
+
+class PoolConexiones:
+    """
+    Pool con una conexión de escritura exclusiva y 'lectores' conexiones de solo lectura, para usar desde varios hilos.
+    Cada conexión espera hasta 'espera_ocupado' segundos si otra aplicación tiene la base bloqueada.
+    """
+
+    def __init__(self, ruta=DB_NAME, lectores=None, config=None, espera_ocupado=5.0):
+        self.ruta = ruta
+        self.espera_ocupado = espera_ocupado
+        self.config = {**(config or {}), "journal_mode": "WAL"}
+        self._bloqueo_escritura = threading.Lock()
+        self._escritor = self._abrir()
+        migrar_esquema(self._escritor)
+        self._lectores = queue.LifoQueue()
+        self._todas = [self._escritor]
+        for _ in range(lectores or os.cpu_count() or 4):
+            conexion = self._abrir()
+            conexion.execute("PRAGMA query_only = 1")
+            self._lectores.put(conexion)
+            self._todas.append(conexion)
+
+    def _abrir(self):
+        # check_same_thread=False: cada conexión la usa un solo hilo a la vez,
+        # pero no siempre el mismo.
+        return conectar(self.ruta, self.config, timeout=self.espera_ocupado, check_same_thread=False)
+
+    @contextlib.contextmanager
+    def lectura(self, timeout=None):
+        """Presta una conexión de solo lectura hasta salir del bloque 'with'."""
+        try:
+            conexion = self._lectores.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No hay conexiones de lectura disponibles.") from None
+        try:
+            yield conexion
+        finally:
+            if conexion.in_transaction:
+                conexion.rollback()
+            self._lectores.put(conexion)
+
+    @contextlib.contextmanager
+    def escritura(self):
+        """
+        Presta la conexión de escritura en exclusiva hasta salir del bloque 'with'.
+        Al salir se hace commit, o rollback si hubo una excepción.
+        """
+        with self._bloqueo_escritura:
+            try:
+                yield self._escritor
+                self._escritor.commit()
+            except BaseException:
+                self._escritor.rollback()
+                raise
+
+    def leer(self, funcion, *args, **kwargs):
+        """
+        Llama a funcion(cursor, *args, **kwargs) con una conexión de lectura; un generador como
+        iterar_dueños debe consumirse dentro de un bloque 'with pool.lectura()'.
+        """
+        with self.lectura() as conexion:
+            return funcion(conexion.cursor(), *args, **kwargs)
+
+    def escribir(self, funcion, *args, **kwargs):
+        """
+        Llama a funcion(cursor, conexion, *args, **kwargs) con la conexión de
+        escritura, p. ej. pool.escribir(eliminar_registro, "Dueños", 5).
+        """
+        with self.escritura() as conexion:
+            return funcion(conexion.cursor(), conexion, *args, **kwargs)
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool."""
+        with self._bloqueo_escritura:
+            for conexion in self._todas:
+                conexion.close()
+            self._todas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
+
+# --- Diagnóstico de Consultas ---
+
+# Sentencias que recorren tablas completas a propósito: nombre (ver
+# consultas_diagnostico) -> tablas o alias recorridos. Cualquier otro recorrido
+# completo se marca como problema.
+RECORRIDOS_ESPERADOS = {
+    # Fragmentos base de los listados, que siempre se usan con un WHERE.
+    "listar_mascotas": ("m",),
+    "listar_consultas": ("c",),
+    "buscar_consultas": ("f",),
+    "nodo": ("Nodo",),  # una sola fila
+    "estadisticas_guardadas": ("Estadisticas",),
+    "origen_estadisticas": ("c",),
+    "agregar_estadisticas": ("c",),
+    "eliminar_consultas_huerfanas": ("Consultas",),
+    "eliminar_mascotas_huerfanas": ("Mascotas",),
+    "exportar_Dueños": ("Dueños",),
+    "exportar_Mascotas": ("Mascotas",),
+    "exportar_Consultas": ("Consultas",),
+    "exportar_historial": ("c",),
+    "importar_ids_Dueños": ("Dueños",),
+    "importar_ids_Mascotas": ("Mascotas",),
+}
+SENTENCIAS_DIAGNOSTICABLES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+def consultas_diagnostico():
+    """Retorna nombre -> sql de las sentencias que emite la aplicación, reunidas de sus constantes y repositorios."""
+    consultas = {
+        nombre[len("SQL_"):].lower(): valor
+        for nombre, valor in globals().items()
+        if nombre.startswith("SQL_") and isinstance(valor, str)
+        and valor.lstrip().upper().startswith(SENTENCIAS_DIAGNOSTICABLES)
+    }
+    consultas["agregar_estadisticas"] = _sql_agregar_estadisticas(SQL_ORIGEN_ESTADISTICAS)
+    for tabla, repositorio in REPOSITORIOS.items():
+        for atributo in dir(repositorio):
+            if atributo.startswith("SQL_"):
+                consultas[f"{tabla}.{atributo[len('SQL_'):].lower()}"] = getattr(repositorio, atributo)
+        for cantidad in range(1, len(repositorio.COLUMNAS) + 1):
+            for columnas in itertools.combinations(repositorio.COLUMNAS, cantidad):
+                consultas[f"{tabla}.actualizar({', '.join(columnas)})"] = _sql_actualizar(tabla, columnas)
+    for fuente, (_, sql) in FUENTES_EXPORTACION.items():
+        consultas[f"exportar_{fuente}"] = sql
+    for tabla in TABLAS_REGISTRADAS:
+        consultas[f"sincronizar_actualizados_{tabla}"] = _sql_cambios_actualizados(tabla)
+        consultas[f"sincronizar_eliminados_{tabla}"] = _sql_cambios_eliminados(tabla)
+        consultas[f"sincronizar_upsert_{tabla}"] = _sql_upsert(tabla)
+    for hija, (columna, padre) in CLAVES_FORANEAS.items():
+        consultas[f"importar_ids_{padre}"] = _sql_ids(padre)
+        # Búsqueda que hace SQLite al borrar en cascada los hijos de un registro.
+        consultas[f"cascada_{hija}_de_{padre}"] = f"SELECT id FROM {hija} WHERE {columna} = ?"
+    return consultas
+
+def diagnosticar_consultas(cursor):
+    """
+    Ejecuta EXPLAIN QUERY PLAN (con parámetros NULL) sobre cada sentencia de consultas_diagnostico().
+    Retorna (nombre, líneas del plan, recorridos completos inesperados) por sentencia.
+    """
+    resultados = []
+    for nombre, sql in consultas_diagnostico().items():
+        recorridos_esperados = RECORRIDOS_ESPERADOS.get(nombre, ())
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?"))
+        plan = [fila[3] for fila in cursor.fetchall()]
+        problemas = []
+        for detalle in plan:
+            if detalle.startswith("SCAN "):
+                objetivo = detalle.split()[1]
+                # '(subquery-N)' es el resultado de una subconsulta, no una tabla.
+                if not objetivo.startswith("(") and objetivo not in recorridos_esperados:
+                    problemas.append(detalle)
+        resultados.append((nombre, plan, problemas))
+    return resultados
+
+def mostrar_diagnostico(resultados):
+    """Muestra el plan de cada consulta y marca las que recorren tablas completas."""
+    print("\n--- DIAGNÓSTICO DE CONSULTAS ---")
+    for nombre, plan, problemas in resultados:
+        estado = "RECORRIDO COMPLETO" if problemas else "OK"
+        print(f"[{estado}] {nombre}")
+        for detalle in plan:
+            print(f"    {detalle}")
+    total = sum(1 for _, _, problemas in resultados if problemas)
+    print(f"Consultas con recorridos completos inesperados: {total}")
+
+# --- Trazas de Rendimiento ---
+
+# Límites superiores (en segundos) de las cubetas de los histogramas de latencia.
+LIMITES_HISTOGRAMA = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+UMBRAL_CONSULTA_LENTA = 0.1  # segundos
+MAX_CONSULTAS_LENTAS = 100
+
+class _Histograma:
+    """Histograma de latencias de una sentencia, con el total de filas afectadas o leídas."""
+    __slots__ = ("cubetas", "suma", "cantidad", "filas")
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_HISTOGRAMA) + 1)  # la última es +Inf
+        self.suma = 0.0
+        self.cantidad = 0
+        self.filas = 0
+
+    def observar(self, segundos, filas):
+        indice = 0
+        while indice < len(LIMITES_HISTOGRAMA) and segundos > LIMITES_HISTOGRAMA[indice]:
+            indice += 1
+        self.cubetas[indice] += 1
+        self.suma += segundos
+        self.cantidad += 1
+        self.filas += filas
+
+class RegistroTrazas:
+    """Histograma de latencias y filas por sentencia SQL, duración de los commits y consultas lentas con su plan."""
+
+    def __init__(self):
+        self.activo = False
+        self.umbral_lento = UMBRAL_CONSULTA_LENTA
+        self.archivo_lentas = None
+        self._bloqueo = threading.Lock()
+        self.limpiar()
+
+    def limpiar(self):
+        """Descarta todas las mediciones acumuladas."""
+        with self._bloqueo:
+            self.histogramas = {}
+            self.lentas = deque(maxlen=MAX_CONSULTAS_LENTAS)
+
+    def registrar(self, conexion, sql, parametros, segundos, filas):
+        """Registra una ejecución de 'sql'; si fue lenta, anota también su plan."""
+        sentencia = " ".join(sql.split())
+        with self._bloqueo:
+            histograma = self.histogramas.get(sentencia)
+            if histograma is None:
+                histograma = self.histogramas[sentencia] = _Histograma()
+            histograma.observar(segundos, filas)
+        if segundos >= self.umbral_lento and sentencia != "COMMIT":
+            self._registrar_lenta(conexion, sql, sentencia, parametros, segundos)
+
+    def _registrar_lenta(self, conexion, sql, sentencia, parametros, segundos):
+        try:
+            # Cursor sin trazas, para no medir el propio EXPLAIN.
+            plan = [fila[3] for fila in sqlite3.Cursor(conexion).execute("EXPLAIN QUERY PLAN " + sql, parametros)]
+        except (sqlite3.Error, ValueError):
+            plan = []  # sentencias sin plan (PRAGMA, BEGIN...) o lotes de executemany
+        momento = datetime.now().strftime(FORMATO_FECHA)
+        with self._bloqueo:
+            self.lentas.append((momento, segundos, sentencia, plan))
+            if self.archivo_lentas:
+                with open(self.archivo_lentas, "a", encoding="utf-8") as archivo:
+                    archivo.write(f"{momento} {segundos * 1000:.3f} ms {sentencia}\n")
+                    for detalle in plan:
+                        archivo.write(f"    {detalle}\n")
+
+    def exportar_prometheus(self):
+        """Retorna las mediciones en el formato de texto de Prometheus."""
+        with self._bloqueo:
+            histogramas = sorted(self.histogramas.items())
+            total_lentas = len(self.lentas)
+        lineas = [
+            "# HELP veterinaria_sql_duracion_segundos Duración de cada sentencia SQL, incluida la lectura de sus filas.",
+            "# TYPE veterinaria_sql_duracion_segundos histogram",
+        ]
+        for sentencia, histograma in histogramas:
+            etiqueta = 'sentencia="' + sentencia.replace("\\", "\\\\").replace('"', '\\"') + '"'
+            acumulado = 0
+            for limite, cantidad in zip((*LIMITES_HISTOGRAMA, "+Inf"), histograma.cubetas):
+                acumulado += cantidad
+                lineas.append(f'veterinaria_sql_duracion_segundos_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+            lineas.append(f"veterinaria_sql_duracion_segundos_sum{{{etiqueta}}} {histograma.suma:.9f}")
+            lineas.append(f"veterinaria_sql_duracion_segundos_count{{{etiqueta}}} {histograma.cantidad}")
+        lineas.append("# HELP veterinaria_sql_filas_total Filas leídas o modificadas por cada sentencia SQL.")
+        lineas.append("# TYPE veterinaria_sql_filas_total counter")
+        for sentencia, histograma in histogramas:
+            etiqueta = 'sentencia="' + sentencia.replace("\\", "\\\\").replace('"', '\\"') + '"'
+            lineas.append(f"veterinaria_sql_filas_total{{{etiqueta}}} {histograma.filas}")
+        lineas.append("# HELP veterinaria_sql_consultas_lentas Consultas lentas guardadas en el registro.")
+        lineas.append("# TYPE veterinaria_sql_consultas_lentas gauge")
+        lineas.append(f"veterinaria_sql_consultas_lentas {total_lentas}")
+        return "\n".join(lineas) + "\n"
+
+TRAZAS = RegistroTrazas()
+
+def activar_trazas(umbral_lento=UMBRAL_CONSULTA_LENTA, archivo_lentas=None):
+    """
+    Mide las conexiones que se abran desde ahora; las consultas de 'umbral_lento' segundos o más se guardan
+    con su plan y, si se indica, se agregan a 'archivo_lentas'.
+    """
+    TRAZAS.umbral_lento = umbral_lento
+    TRAZAS.archivo_lentas = archivo_lentas
+    TRAZAS.activo = True
+
+def desactivar_trazas():
+    """Las conexiones que se abran desde ahora no se miden."""
+    TRAZAS.activo = False
+
+class CursorTrazado(sqlite3.Cursor):
+    """Cursor que mide cada sentencia; en las lecturas la medición llega hasta agotar o leer el resultado."""
+
+    _pendiente = None  # [sql, parámetros, segundos, filas] de la lectura en curso
+
+    def _registrar_pendiente(self):
+        sql, parametros, segundos, filas = self._pendiente
+        self._pendiente = None
+        TRAZAS.registrar(self.connection, sql, parametros, segundos, filas)
+
+    def _leido(self, inicio, filas):
+        """Suma a la lectura en curso el tiempo y las filas de un fetch; retorna True si hay una."""
+        if self._pendiente is None:
+            return False
+        self._pendiente[2] += time.perf_counter() - inicio
+        self._pendiente[3] += filas
+        return True
+
+    def execute(self, sql, parametros=()):
+        if self._pendiente:
+            self._registrar_pendiente()
+        inicio = time.perf_counter()
+        super().execute(sql, parametros)
+        segundos = time.perf_counter() - inicio
+        if self.description is None:
+            TRAZAS.registrar(self.connection, sql, parametros, segundos, max(self.rowcount, 0))
+        else:
+            self._pendiente = [sql, parametros, segundos, 0]
+        return self
+
+    def executemany(self, sql, secuencia_parametros):
+        if self._pendiente:
+            self._registrar_pendiente()
+        inicio = time.perf_counter()
+        super().executemany(sql, secuencia_parametros)
+        TRAZAS.registrar(self.connection, sql, (), time.perf_counter() - inicio, max(self.rowcount, 0))
+        return self
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        if self._leido(inicio, len(filas)):
+            self._registrar_pendiente()
+        return filas
+
+    def fetchmany(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(*args, **kwargs)
+        self._leido(inicio, len(filas))
+        return filas
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._leido(inicio, fila is not None)
+        return fila
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            if self._leido(inicio, 0):
+                self._registrar_pendiente()
+            raise
+        self._leido(inicio, 1)
+        return fila
+
+    def close(self):
+        if self._pendiente:
+            self._registrar_pendiente()
+        super().close()
+
+class ConexionTrazada(Conexion):
+    """Conexión cuyos cursores se miden, igual que cada commit."""
+
+    def cursor(self, factory=CursorTrazado):
+        return super().cursor(factory)
+
+    # Connection.execute no pasa por cursor(): se redefine para usar CursorTrazado.
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia_parametros):
+        return self.cursor().executemany(sql, secuencia_parametros)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        super().commit()
+        TRAZAS.registrar(self, "COMMIT", (), time.perf_counter() - inicio, 0)
+
+def mostrar_trazas(limite=20):
+    """Muestra las sentencias que más tiempo acumulan y las últimas consultas lentas."""
+    print("\n--- MÉTRICAS DE RENDIMIENTO ---")
+    if not TRAZAS.activo and not TRAZAS.histogramas:
+        print("Las trazas están desactivadas. Inicie con --trazas o la variable VETERINARIA_TRAZAS=1.")
+        return
+    with TRAZAS._bloqueo:
+        histogramas = sorted(TRAZAS.histogramas.items(), key=lambda item: item[1].suma, reverse=True)[:limite]
+        lentas = list(TRAZAS.lentas)
+    for sentencia, histograma in histogramas:
+        print(f"{histograma.suma * 1000:10.2f} ms en {histograma.cantidad:6d} ejecuciones "
+              f"({histograma.suma / histograma.cantidad * 1000:.3f} ms c/u, {histograma.filas} filas): {sentencia[:90]}")
+    print(f"\nConsultas lentas (>= {TRAZAS.umbral_lento * 1000:.0f} ms): {len(lentas)}")
+    for momento, segundos, sentencia, plan in lentas[-10:]:
+        print(f"{momento} {segundos * 1000:.1f} ms {sentencia[:90]}")
+        for detalle in plan:
+            print(f"    {detalle}")
+
+if os.environ.get("VETERINARIA_TRAZAS"):
+    activar_trazas()
+
 # --- Funciones de Datos de Ejemplo (Opcional) ---
 
 def insertar_datos_iniciales(cursor, conexion):
-    """Inserta datos de ejemplo en las tablas."""
+    """
+    Inserta datos de ejemplo en las tablas.
+    Solo se usa a pedido: con --limpio o con el comando 'datos-ejemplo'.
+    """
     print("\n--- Insertando datos de ejemplo ---")
-    id_dueño1 = insertar_dueño(cursor, conexion, "Juan Pérez", "3101234567", "Calle Falsa 123")
-    id_dueño2 = insertar_dueño(cursor, conexion, "María García", "3209876543", "Carrera Siempre Viva 742")
-
-    if id_dueño1 and id_dueño2:
-        id_mascota1 = insertar_mascota(cursor, conexion, "Fido", "Perro", "Labrador", 5, id_dueño1)
-        id_mascota2 = insertar_mascota(cursor, conexion, "Luna", "Gato", "Siamés", 2, id_dueño1)
-        id_mascota3 = insertar_mascota(cursor, conexion, "Coco", "Pájaro", "Periquito", 1, id_dueño2)
-
-        if id_mascota1:
-            insertar_consulta(cursor, conexion, "2025-06-05 10:00:00", "Chequeo Anual", "Todo en orden.", id_mascota1)
-            insertar_consulta(cursor, conexion, "2025-06-08 14:30:00", "Vacunación", "Vacuna de refuerzo aplicada.", id_mascota1)
-        if id_mascota2:
-            insertar_consulta(cursor, conexion, "2025-06-07 11:00:00", "Problema respiratorio", "Bronquitis leve, tratamiento con antibióticos.", id_mascota2)
+    dueños = RepositorioDueños(conexion, cursor, confirmar=False)
+    mascotas = RepositorioMascotas(conexion, cursor, confirmar=False)
+    consultas = RepositorioConsultas(conexion, cursor, confirmar=False)
+    try:
+        id_dueño1 = dueños.insertar("Juan Pérez", "3101234567", "Calle Falsa 123")
+        id_dueño2 = dueños.insertar("María García", "3209876543", "Carrera Siempre Viva 742")
+        id_mascota1 = mascotas.insertar("Fido", "Perro", "Labrador", 5, id_dueño1)
+        id_mascota2 = mascotas.insertar("Luna", "Gato", "Siamés", 2, id_dueño1)
+        mascotas.insertar("Coco", "Pájaro", "Periquito", 1, id_dueño2)
+        consultas.insertar("2025-06-05 10:00:00", "Chequeo Anual", "Todo en orden.", id_mascota1)
+        consultas.insertar("2025-06-08 14:30:00", "Vacunación", "Vacuna de refuerzo aplicada.", id_mascota1)
+        consultas.insertar("2025-06-07 11:00:00", "Problema respiratorio", "Bronquitis leve, tratamiento con antibióticos.", id_mascota2)
+        conexion.commit()
+    except sqlite3.Error as e:
+        conexion.rollback()
+        limpiar_cache()
+        print(f"Error al insertar los datos de ejemplo: {e}")
+        return False
 
-    print("Datos de ejemplo insertados.")
+    print("Datos de ejemplo insertados: 2 dueños, 3 mascotas y 3 consultas.")
+    return True
 
 # --- Función Principal y Menú Interactivo ---
 
@@ -308,7 +2354,8 @@ def mostrar_menu():
     print("2. Consultar y mostrar registros")
     print("3. Actualizar registro existente")
     print("4. Eliminar registro")
-    print("5. Salir")
+    print("5. Reportes")
+    print("6. Salir")
 
 def mostrar_menu_insertar():
     """Muestra el submenú para insertar registros."""
@@ -326,7 +2373,21 @@ def mostrar_menu_consultar():
     print("3. Mostrar todas las Consultas")
     print("4. Mostrar Mascotas por Dueño ID")
     print("5. Mostrar Consultas por Mascota ID")
-    print("6. Volver al menú principal")
+    print("6. Buscar Consultas por motivo o diagnóstico")
+    print("7. Agenda del día")
+    print("8. Últimas visitas de una Mascota")
+    print("9. Volver al menú principal")
+
+def mostrar_menu_reportes():
+    """Muestra el submenú de reportes de la clínica."""
+    print("\n--- REPORTES ---")
+    print("1. Visitas por especie")
+    print("2. Dueños con más visitas")
+    print("3. Visitas por mes")
+    print("4. Motivos de consulta más comunes")
+    print("5. Verificar y reparar estadísticas")
+    print("6. Métricas de rendimiento (trazas)")
+    print("7. Volver al menú principal")
 
 def mostrar_menu_actualizar():
     """Muestra el submenú para actualizar registros."""
@@ -344,16 +2405,30 @@ def mostrar_menu_eliminar():
     print("3. Eliminar Consulta")
     print("4. Volver al menú principal")
 
-def main():
-    """Función principal que ejecuta la aplicación de la veterinaria."""
-    conexion, cursor = crear_base_datos()
-    crear_tablas(cursor)
-    insertar_datos_iniciales(cursor, conexion) # Para tener algunos datos al inicio
+def continuar_paginacion():
+    """Pregunta si se muestra la siguiente página de un listado."""
+    respuesta = input("-- Enter para ver la siguiente página, 'q' para terminar: ")
+    return respuesta.strip().lower() != 'q'
+
+def main(ruta=DB_NAME, limpio=False, config=None):
+    """
+    Función principal que ejecuta la aplicación de la veterinaria.
+    Con limpio=True recrea la base con datos de ejemplo; si no, la abre al elegir la primera opción que la usa.
+    """
+    conexion = cursor = None
+    if limpio:
+        conexion, cursor = crear_base_datos(ruta, config)
+        migrar_esquema(conexion)
+        insertar_datos_iniciales(cursor, conexion) # Para tener algunos datos al inicio
 
     while True:
         mostrar_menu()
         opcion_principal = input("Seleccione una opción: ")
 
+        if conexion is None and opcion_principal in ('1', '2', '3', '4', '5'):
+            conexion, cursor = abrir_base_datos(ruta, config)
+            print(f"Base de datos abierta: {ruta}")
+
         if opcion_principal == '1': # Insertar
             while True:
                 mostrar_menu_insertar()
@@ -396,24 +2471,42 @@ def main():
                 mostrar_menu_consultar()
                 opcion_consultar = input("Seleccione una opción de consulta: ")
                 if opcion_consultar == '1':
-                    mostrar_dueños(cursor)
+                    mostrar_dueños(cursor, continuar=continuar_paginacion)
                 elif opcion_consultar == '2':
-                    mostrar_mascotas(cursor)
+                    mostrar_mascotas(cursor, continuar=continuar_paginacion)
                 elif opcion_consultar == '3':
-                    mostrar_consultas(cursor)
+                    mostrar_consultas(cursor, continuar=continuar_paginacion)
                 elif opcion_consultar == '4':
                     id_d = input("Ingrese el ID del Dueño para ver sus mascotas: ")
                     if id_d.isdigit():
-                        mostrar_mascotas(cursor, int(id_d))
+                        mostrar_mascotas(cursor, int(id_d), continuar=continuar_paginacion)
                     else:
                         print("ID de Dueño no válido.")
                 elif opcion_consultar == '5':
                     id_m = input("Ingrese el ID de la Mascota para ver sus consultas: ")
                     if id_m.isdigit():
-                        mostrar_consultas(cursor, int(id_m))
+                        mostrar_consultas(cursor, int(id_m), continuar=continuar_paginacion)
                     else:
                         print("ID de Mascota no válido.")
                 elif opcion_consultar == '6':
+                    texto = input("Palabras a buscar en motivo o diagnóstico: ")
+                    desde = input("Desde la fecha (YYYY-MM-DD, opcional): ") or None
+                    hasta = input("Hasta la fecha, sin incluirla (YYYY-MM-DD, opcional): ") or None
+                    mostrar_busqueda_consultas(cursor, texto, desde, hasta)
+                elif opcion_consultar == '7':
+                    dia = input("Día de la agenda (YYYY-MM-DD, en blanco para hoy): ") or None
+                    try:
+                        mostrar_agenda(cursor, agenda_dia(cursor, dia), f"AGENDA DEL {dia or date.today()}",
+                                       continuar=continuar_paginacion)
+                    except ValueError as e:
+                        print(e)
+                elif opcion_consultar == '8':
+                    id_m = input("Ingrese el ID de la Mascota: ")
+                    if id_m.isdigit():
+                        mostrar_agenda(cursor, ultimas_visitas(cursor, int(id_m)), f"ÚLTIMAS VISITAS DE LA MASCOTA ID {id_m}")
+                    else:
+                        print("ID de Mascota no válido.")
+                elif opcion_consultar == '9':
                     break
                 else:
                     print("Opción no válida.")
@@ -487,13 +2580,587 @@ def main():
                 else:
                     print("Opción no válida.")
 
-        elif opcion_principal == '5': # Salir
+        elif opcion_principal == '5': # Reportes
+            while True:
+                mostrar_menu_reportes()
+                opcion_reportes = input("Seleccione una opción de reporte: ")
+                if opcion_reportes == '1':
+                    mostrar_reporte(cursor, "especie")
+                elif opcion_reportes == '2':
+                    mostrar_reporte(cursor, "dueño", 10)
+                elif opcion_reportes == '3':
+                    mostrar_reporte(cursor, "mes")
+                elif opcion_reportes == '4':
+                    mostrar_reporte(cursor, "motivo", 10)
+                elif opcion_reportes == '5':
+                    mostrar_verificacion_estadisticas(conexion, reparar=True)
+                elif opcion_reportes == '6':
+                    mostrar_trazas()
+                elif opcion_reportes == '7':
+                    break
+                else:
+                    print("Opción no válida.")
+
+        elif opcion_principal == '6': # Salir
             break
         else:
             print("Opción principal no válida.")
 
-    conexion.close()
-    print("Conexión a la base de datos cerrada. ¡Hasta luego!")
+    if conexion is not None:
+        conexion.execute("PRAGMA optimize") # Actualiza las estadísticas de los índices si hace falta
+        conexion.close()
+        print("Conexión a la base de datos cerrada.")
+    print("¡Hasta luego!")
+
+# --- Interfaz de Línea de Comandos ---
+
+def _comando_importar(args):
+    """Ejecuta el comando 'importar' sobre la base de datos indicada."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        resultado = importar_archivo(cursor, conexion, args.archivo, args.tabla, args.lote)
+    except (sqlite3.Error, OSError, UnicodeDecodeError) as e:
+        print(f"Error al importar: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conexion.close()
+    mostrar_resultado_importacion(resultado)
+    return 0 if resultado["rechazadas"] == 0 else 1
+
+def _comando_datos_ejemplo(args):
+    """Ejecuta el comando 'datos-ejemplo': agrega los datos de ejemplo a la base de datos."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        insertados = insertar_datos_iniciales(cursor, conexion)
+    finally:
+        conexion.close()
+    return 0 if insertados else 1
+
+def _comando_mantenimiento(args):
+    """Ejecuta el comando 'mantenimiento': huérfanos, ANALYZE y VACUUM."""
+    conexion, _ = abrir_base_datos(args.db, args.pragma)
+    try:
+        resultado = mantenimiento(conexion, vacuum=not args.sin_vacuum)
+    finally:
+        conexion.close()
+    mostrar_mantenimiento(resultado)
+    return 0
+
+def _comando_sincronizar(args):
+    """Ejecuta el comando 'sincronizar': envía los cambios de --db a otra base de datos."""
+    origen, _ = abrir_base_datos(args.db, args.pragma)
+    destino, _ = abrir_base_datos(args.destino, args.pragma)
+    try:
+        resultado = sincronizar(origen, destino, args.lote, args.desplazamiento, args.podar)
+    except sqlite3.Error as e:
+        print(f"Error al sincronizar: {e}. Se puede volver a ejecutar sin riesgo.", file=sys.stderr)
+        return 1
+    finally:
+        origen.close()
+        destino.close()
+    mostrar_resultado_sincronizacion(resultado)
+    return 0
+
+def _comando_respaldar(args):
+    """Ejecuta el comando 'respaldar': copia de seguridad en línea."""
+    conexion = conectar(args.db, args.pragma)
+    try:
+        resultado = respaldar(conexion, args.destino, args.paginas, args.pausa)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error al respaldar: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conexion.close()
+    print(f"Copia guardada en {resultado['ruta']}: {resultado['paginas']} páginas en {resultado['pasos']} pasos, "
+          f"{resultado['reinicios']} reinicios, {resultado['segundos']:.2f} s.")
+    return 0
+
+def _comando_restaurar(args):
+    """Ejecuta el comando 'restaurar': reemplaza la base por una copia de seguridad."""
+    try:
+        anterior = restaurar(args.respaldo, args.db, args.pragma)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error al restaurar: {e}", file=sys.stderr)
+        return 1
+    print(f"Base de datos {args.db} restaurada desde {args.respaldo}.")
+    if anterior:
+        print(f"El contenido anterior quedó en {anterior}.")
+    return 0
+
+def _comando_verificar_integridad(args):
+    """Ejecuta el comando 'verificar-integridad' sobre la base o una copia."""
+    ruta = args.archivo or args.db
+    if not os.path.exists(ruta):
+        print(f"No existe el archivo: {ruta}", file=sys.stderr)
+        return 1
+    conexion = _conectar_copia(ruta)
+    try:
+        problemas = verificar_integridad(conexion)
+    finally:
+        conexion.close()
+    for problema in problemas[:20]:
+        print(problema)
+    print(f"{ruta}: {'sin problemas' if not problemas else f'{len(problemas)} problemas'}.")
+    return 0 if not problemas else 1
+
+def _comando_respaldos_periodicos(args):
+    """Ejecuta el comando 'respaldos-periodicos' en primer plano hasta Ctrl+C."""
+    respaldo = RespaldoPeriodico(args.db, args.directorio, args.intervalo * 60, args.conservar, args.pragma, inmediato=True)
+    print(f"Copias de {args.db} en {args.directorio} cada {args.intervalo} min. Ctrl+C para terminar.")
+    with respaldo:
+        try:
+            while respaldo.is_alive():
+                respaldo.join(1.0)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+def _comando_exportar(args):
+    """Ejecuta el comando 'exportar': vuelca las tablas a archivos desde una misma foto de la base."""
+    conexion, _ = abrir_base_datos(args.db, args.pragma)
+    inicio = time.perf_counter()
+    try:
+        resultado = exportar_datos(conexion, args.directorio, args.fuentes or ORDEN_IMPORTACION, args.formato, args.comprimir)
+    except (OSError, ValueError) as e:
+        print(f"Error al exportar: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conexion.close()
+    for fuente, (ruta, filas) in resultado.items():
+        print(f"{fuente}: {filas} filas -> {ruta}")
+    print(f"Tiempo: {time.perf_counter() - inicio:.2f} s")
+    return 0
+
+class _AccionPragma(argparse.Action):
+    """Acumula opciones --pragma NOMBRE=VALOR en un diccionario."""
+
+    def __call__(self, parser, namespace, valor, option_string=None):
+        nombre, separador, ajuste = valor.partition("=")
+        if not separador or nombre not in PRAGMAS_CONFIGURABLES:
+            parser.error(f"--pragma debe ser NOMBRE=VALOR con NOMBRE en: {', '.join(PRAGMAS_CONFIGURABLES)}")
+        ajustes = dict(getattr(namespace, self.dest) or {})
+        ajustes[nombre] = ajuste
+        setattr(namespace, self.dest, ajustes)
+
+def _comando_diagnosticar(args):
+    """Ejecuta el comando 'diagnosticar': revisa el plan de todas las consultas."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        resultados = diagnosticar_consultas(cursor)
+    finally:
+        conexion.close()
+    mostrar_diagnostico(resultados)
+    return 1 if any(problemas for _, _, problemas in resultados) else 0
+
+def _comando_reconstruir_busqueda(args):
+    """Ejecuta el comando 'reconstruir-busqueda': regenera el índice de texto completo."""
+    conexion, _ = abrir_base_datos(args.db, args.pragma)
+    try:
+        reconstruir_indice_busqueda(conexion)
+    finally:
+        conexion.close()
+    print("Índice de búsqueda de consultas reconstruido.")
+    return 0
+
+def _comando_buscar(args):
+    """Ejecuta el comando 'buscar': búsqueda de texto en las consultas."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        encontradas = mostrar_busqueda_consultas(cursor, " ".join(args.texto), args.desde, args.hasta, args.limite)
+    finally:
+        conexion.close()
+    return 0 if encontradas else 1
+
+def _comando_agenda(args):
+    """Ejecuta el comando 'agenda': consultas de un día, una semana o un rango."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        if args.desde or args.hasta:
+            if not (args.desde and args.hasta):
+                print("Indique --desde y --hasta juntos.")
+                return 2
+            consultas, titulo = agenda(cursor, args.desde, args.hasta), f"AGENDA DEL {args.desde} AL {args.hasta}"
+        elif args.semana:
+            consultas, titulo = agenda_semana(cursor, args.dia), f"AGENDA DE LA SEMANA DEL {args.dia or date.today()}"
+        else:
+            consultas, titulo = agenda_dia(cursor, args.dia), f"AGENDA DEL {args.dia or date.today()}"
+        mostrar_agenda(cursor, consultas, titulo)
+    except ValueError as e:
+        print(e)
+        return 2
+    finally:
+        conexion.close()
+    return 0
+
+def _comando_reporte(args):
+    """Ejecuta el comando 'reporte': visitas por especie, dueño, mes o motivo."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        mostrar_reporte(cursor, args.dimension, args.limite)
+    finally:
+        conexion.close()
+    return 0
+
+def _comando_verificar_estadisticas(args):
+    """Ejecuta el comando 'verificar-estadisticas'."""
+    conexion, _ = abrir_base_datos(args.db, args.pragma)
+    try:
+        consistentes = mostrar_verificacion_estadisticas(conexion, args.reparar)
+    finally:
+        conexion.close()
+    return 0 if consistentes else 1
+
+# Operaciones de datos de la línea de comandos: cada una recibe los argumentos,
+# la conexión y el cursor, no hace commit y retorna el código de salida. Así
+# pueden correr solas o muchas seguidas en una sola transacción con 'lote'.
+
+def _operacion_agregar_dueño(args, conexion, cursor):
+    print(RepositorioDueños(conexion, cursor, confirmar=False).insertar(args.nombre, args.telefono, args.direccion))
+    return 0
+
+def _operacion_agregar_mascota(args, conexion, cursor):
+    print(RepositorioMascotas(conexion, cursor, confirmar=False).insertar(
+        args.nombre, args.especie, args.raza, args.edad, args.dueño))
+    return 0
+
+def _operacion_agregar_consulta(args, conexion, cursor):
+    print(RepositorioConsultas(conexion, cursor, confirmar=False).insertar(
+        args.fecha or datetime.now(), args.motivo, args.diagnostico, args.mascota))
+    return 0
+
+def _operacion_listar_dueños(args, conexion, cursor):
+    mostrar_dueños(cursor, args.pagina)
+    return 0
+
+def _operacion_listar_mascotas(args, conexion, cursor):
+    mostrar_mascotas(cursor, args.dueño, args.pagina)
+    return 0
+
+def _operacion_listar_consultas(args, conexion, cursor):
+    mostrar_consultas(cursor, args.mascota, args.pagina)
+    return 0
+
+def _operacion_actualizar(args, conexion, cursor):
+    repositorio = REPOSITORIOS[args.tabla]
+    campos = {columna: getattr(args, columna) for columna in repositorio.COLUMNAS}
+    campos = {columna: valor for columna, valor in campos.items() if valor is not None}
+    if repositorio(conexion, cursor, confirmar=False).actualizar(args.id, **campos):
+        return 0
+    print(f"No se encontró el registro ID {args.id} en la tabla '{args.tabla}'.", file=sys.stderr)
+    return 1
+
+def _operacion_eliminar(args, conexion, cursor):
+    eliminados = REPOSITORIOS[args.tabla](conexion, cursor, confirmar=False).eliminar_varios(args.ids)
+    if eliminados == len(set(args.ids)):
+        return 0
+    print(f"Se eliminaron {eliminados} de {len(set(args.ids))} registros de la tabla '{args.tabla}'; el resto no existía.",
+          file=sys.stderr)
+    return 1
+
+def _operacion_eliminar_consultas(args, conexion, cursor):
+    print(RepositorioConsultas(conexion, cursor, confirmar=False).eliminar_por_fecha(args.desde, args.hasta))
+    return 0
+
+def _comando_operacion(args):
+    """Ejecuta una operación de datos sola, en su propia transacción."""
+    conexion, cursor = abrir_base_datos(args.db, args.pragma)
+    try:
+        codigo = args.operacion(args, conexion, cursor)
+        conexion.commit()
+    except (sqlite3.Error, ValueError) as e:
+        conexion.rollback()
+        limpiar_cache()
+        print(f"Error: {e}", file=sys.stderr)
+        codigo = 1
+    finally:
+        conexion.close()
+    return codigo
+
+def _leer_lineas_lote(ruta):
+    """Genera (número, línea) de los comandos de un archivo, o de la entrada estándar si ruta es '-'."""
+    archivo = sys.stdin if ruta == "-" else open(ruta, encoding="utf-8")
+    try:
+        for numero, linea in enumerate(archivo, 1):
+            linea = linea.strip()
+            if linea and not linea.startswith("#"):
+                yield numero, linea
+    finally:
+        if archivo is not sys.stdin:
+            archivo.close()
+
+def ejecutar_lote(conexion, lineas, parser=None, seguir=False):
+    """
+    Ejecuta comandos de datos, uno por línea, en una sola transacción y muestra su salida después del commit.
+    Con seguir=True solo se descartan los comandos que fallen. Retorna (ejecutados, fallidos).
+    """
+    import shlex
+    parser = parser or crear_parser_lote()
+    cursor = conexion.cursor()
+    ejecutados = fallidos = 0
+    salida = []
+    if not conexion.in_transaction:
+        conexion.execute("BEGIN")
+    try:
+        for numero, linea in lineas:
+            try:
+                args = parser.parse_args(shlex.split(linea))
+            except (SystemExit, ValueError):
+                # argparse ya mostró el error de sintaxis.
+                error = "comando no válido"
+            else:
+                if getattr(args, "operacion", None) is None:
+                    error = f"'{args.comando}' no se puede usar en un lote"
+                else:
+                    error = None
+            if error is None:
+                cursor.execute("SAVEPOINT comando")
+                impreso = io.StringIO()
+                try:
+                    with contextlib.redirect_stdout(impreso):
+                        codigo = args.operacion(args, conexion, cursor)
+                    if codigo != 0:
+                        error = "el comando no tuvo efecto"
+                except (sqlite3.Error, ValueError) as e:
+                    error = str(e)
+                if error is None:
+                    cursor.execute("RELEASE comando")
+                    salida.append(impreso.getvalue())
+                else:
+                    cursor.execute("ROLLBACK TO comando")
+                    cursor.execute("RELEASE comando")
+            if error is None:
+                ejecutados += 1
+                continue
+            fallidos += 1
+            print(f"Línea {numero}: {error}: {linea}", file=sys.stderr)
+            if not seguir:
+                raise sqlite3.OperationalError(f"lote cancelado en la línea {numero}")
+        conexion.commit()
+    except BaseException:
+        conexion.rollback()
+        # La caché pudo guardar registros de la transacción deshecha.
+        limpiar_cache()
+        raise
+    sys.stdout.write("".join(salida))
+    return ejecutados, fallidos
+
+def _comando_lote(args):
+    """Ejecuta el comando 'lote' sobre la base de datos indicada."""
+    conexion, _ = abrir_base_datos(args.db, args.pragma)
+    inicio = time.perf_counter()
+    try:
+        ejecutados, fallidos = ejecutar_lote(conexion, _leer_lineas_lote(args.archivo), seguir=args.seguir)
+    except (sqlite3.Error, OSError, UnicodeDecodeError) as e:
+        print(f"Error: {e}. No se guardó ningún cambio.", file=sys.stderr)
+        return 1
+    finally:
+        conexion.close()
+    print(f"Lote confirmado: {ejecutados} comandos en {time.perf_counter() - inicio:.2f} s, {fallidos} fallidos.",
+          file=sys.stderr)
+    return 0 if fallidos == 0 else 1
+
+def _agregar_comandos_datos(subparsers):
+    """Agrega los comandos de datos, los que también se pueden usar dentro de un lote."""
+    def operacion(nombre, alias, ayuda, funcion, **valores):
+        sub_parser = subparsers.add_parser(nombre, aliases=alias, help=ayuda)
+        sub_parser.set_defaults(funcion=_comando_operacion, operacion=funcion, **valores)
+        return sub_parser
+
+    agregar = operacion("agregar-dueño", ["add-owner"], "Agrega un dueño e imprime su id.", _operacion_agregar_dueño)
+    agregar.add_argument("nombre")
+    agregar.add_argument("--telefono")
+    agregar.add_argument("--direccion")
+
+    agregar = operacion("agregar-mascota", ["add-pet"], "Agrega una mascota e imprime su id.", _operacion_agregar_mascota)
+    agregar.add_argument("nombre")
+    agregar.add_argument("--dueño", "--owner", type=int, required=True, help="ID del dueño.")
+    agregar.add_argument("--especie")
+    agregar.add_argument("--raza")
+    agregar.add_argument("--edad", type=int)
+
+    agregar = operacion("agregar-consulta", ["add-consulta"], "Agrega una consulta e imprime su id.", _operacion_agregar_consulta)
+    agregar.add_argument("--mascota", "--pet", type=int, required=True, help="ID de la mascota.")
+    agregar.add_argument("--motivo", required=True)
+    agregar.add_argument("--diagnostico")
+    agregar.add_argument("--fecha", help="Fecha y hora de la consulta (por defecto, ahora).")
+
+    listar = operacion("listar-dueños", ["list-owners"], "Lista los dueños.", _operacion_listar_dueños)
+    listar.add_argument("--pagina", type=int, default=TAMAÑO_PAGINA, help="Filas leídas por consulta.")
+
+    listar = operacion("listar-mascotas", ["list-pets"], "Lista las mascotas, opcionalmente de un dueño.", _operacion_listar_mascotas)
+    listar.add_argument("--dueño", "--owner", type=int, help="ID del dueño.")
+    listar.add_argument("--pagina", type=int, default=TAMAÑO_PAGINA, help="Filas leídas por consulta.")
+
+    listar = operacion("listar-consultas", ["list-consultas"], "Lista las consultas, opcionalmente de una mascota.", _operacion_listar_consultas)
+    listar.add_argument("--mascota", "--pet", type=int, help="ID de la mascota.")
+    listar.add_argument("--pagina", type=int, default=TAMAÑO_PAGINA, help="Filas leídas por consulta.")
+
+    actualizar = operacion("actualizar-dueño", ["update-owner"], "Actualiza los datos indicados de un dueño.", _operacion_actualizar, tabla="Dueños")
+    actualizar.add_argument("id", type=int)
+    actualizar.add_argument("--nombre")
+    actualizar.add_argument("--telefono")
+    actualizar.add_argument("--direccion")
+
+    actualizar = operacion("actualizar-mascota", ["update-pet"], "Actualiza los datos indicados de una mascota.", _operacion_actualizar, tabla="Mascotas")
+    actualizar.add_argument("id", type=int)
+    actualizar.add_argument("--nombre")
+    actualizar.add_argument("--especie")
+    actualizar.add_argument("--raza")
+    actualizar.add_argument("--edad", type=int)
+    actualizar.add_argument("--dueño", "--owner", dest="id_dueño", type=int, help="ID del nuevo dueño.")
+
+    actualizar = operacion("actualizar-consulta", ["update-consulta"], "Actualiza los datos indicados de una consulta.", _operacion_actualizar, tabla="Consultas")
+    actualizar.add_argument("id", type=int)
+    actualizar.add_argument("--fecha")
+    actualizar.add_argument("--motivo")
+    actualizar.add_argument("--diagnostico")
+    actualizar.add_argument("--mascota", "--pet", dest="id_mascota", type=int, help="ID de la nueva mascota.")
+
+    eliminar = operacion("eliminar", ["delete"], "Elimina registros de Dueños, Mascotas o Consultas (con sus dependientes).", _operacion_eliminar)
+    eliminar.add_argument("tabla", type=str.capitalize, choices=list(REPOSITORIOS))
+    eliminar.add_argument("ids", type=int, nargs="+", metavar="ID")
+
+    eliminar = operacion("eliminar-consultas", ["delete-consultas"], "Elimina las consultas de un rango de fechas e imprime cuántas eran.",
+                         _operacion_eliminar_consultas)
+    eliminar.add_argument("--desde", required=True, help="Inicio del rango (incluido).")
+    eliminar.add_argument("--hasta", required=True, help="Fin del rango (excluido).")
+
+def crear_parser_lote():
+    """Crea el parser de una línea de lote: solo los comandos de datos, sin las opciones generales."""
+    parser = argparse.ArgumentParser(prog="lote", description="Comando de datos de un lote.")
+    _agregar_comandos_datos(parser.add_subparsers(dest="comando", required=True))
+    return parser
+
+def crear_parser():
+    """Crea el parser de argumentos para los comandos no interactivos."""
+    parser = argparse.ArgumentParser(prog="admin_veterinaria.py", description="Administración de la veterinaria.")
+    parser.add_argument("--db", default=DB_NAME, help=f"Ruta de la base de datos (por defecto: {DB_NAME}).")
+    parser.add_argument("--pragma", action=_AccionPragma, default={}, metavar="NOMBRE=VALOR",
+                        help="Ajuste de conexión SQLite, p. ej. --pragma synchronous=FULL (se puede repetir).")
+    parser.add_argument("--limpio", action="store_true",
+                        help="Recrea la base de datos desde cero con datos de ejemplo antes de abrir el menú.")
+    parser.add_argument("--respaldo-cada", type=float, metavar="MINUTOS",
+                        help=f"Mientras se usa el menú, hace copias de seguridad en segundo plano en '{DIRECTORIO_RESPALDOS}'.")
+    parser.add_argument("--trazas", action="store_true",
+                        help="Mide cada sentencia SQL (también con la variable de entorno VETERINARIA_TRAZAS=1).")
+    parser.add_argument("--umbral-lento", type=float, default=UMBRAL_CONSULTA_LENTA * 1000, metavar="MS",
+                        help="Milisegundos a partir de los cuales una consulta se registra como lenta.")
+    parser.add_argument("--registro-lentas", metavar="ARCHIVO", help="Agrega las consultas lentas y su plan a este archivo.")
+    parser.add_argument("--metricas", metavar="ARCHIVO",
+                        help="Al terminar, guarda las métricas en formato de texto de Prometheus (activa --trazas).")
+    subparsers = parser.add_subparsers(dest="comando")
+
+    importar = subparsers.add_parser("importar", help="Importa masivamente registros desde un archivo CSV o JSONL.")
+    importar.add_argument("archivo", help="Archivo .csv o .jsonl a importar.")
+    importar.add_argument("--tabla", choices=ORDEN_IMPORTACION, help="Tabla de destino para las filas que no indiquen 'tabla'.")
+    importar.add_argument("--lote", type=int, default=TAMAÑO_LOTE_IMPORTACION, help="Filas por transacción.")
+    importar.set_defaults(funcion=_comando_importar)
+
+    diagnosticar = subparsers.add_parser("diagnosticar", help="Muestra el plan de las consultas y marca los recorridos completos de tabla.")
+    diagnosticar.set_defaults(funcion=_comando_diagnosticar)
+
+    buscar = subparsers.add_parser("buscar", help="Busca consultas por palabras del motivo o el diagnóstico.")
+    buscar.add_argument("texto", nargs="+", help="Palabras a buscar.")
+    buscar.add_argument("--desde", help="Fecha mínima (YYYY-MM-DD).")
+    buscar.add_argument("--hasta", help="Fecha máxima, sin incluirla (YYYY-MM-DD).")
+    buscar.add_argument("--limite", type=int, default=LIMITE_BUSQUEDA)
+    buscar.set_defaults(funcion=_comando_buscar)
+
+    agenda_parser = subparsers.add_parser("agenda", help="Muestra las consultas de un día, una semana o un rango de fechas.")
+    agenda_parser.add_argument("--dia", help="Día de la agenda (YYYY-MM-DD, por defecto hoy).")
+    agenda_parser.add_argument("--semana", action="store_true", help="Muestra la semana completa que contiene el día.")
+    agenda_parser.add_argument("--desde", help="Inicio del rango (incluido).")
+    agenda_parser.add_argument("--hasta", help="Fin del rango (excluido).")
+    agenda_parser.set_defaults(funcion=_comando_agenda)
+
+    reporte = subparsers.add_parser("reporte", help="Muestra las visitas por especie, dueño, mes o motivo.")
+    reporte.add_argument("dimension", choices=DIMENSIONES_ESTADISTICAS)
+    reporte.add_argument("--limite", type=int, help="Cantidad máxima de filas.")
+    reporte.set_defaults(funcion=_comando_reporte)
+
+    verificar = subparsers.add_parser("verificar-estadisticas", help="Compara las estadísticas guardadas con un cálculo desde cero.")
+    verificar.add_argument("--reparar", action="store_true", help="Reconstruye las estadísticas si hay diferencias.")
+    verificar.set_defaults(funcion=_comando_verificar_estadisticas)
+
+    reconstruir = subparsers.add_parser("reconstruir-busqueda", help="Regenera el índice de texto completo de las consultas.")
+    reconstruir.set_defaults(funcion=_comando_reconstruir_busqueda)
+
+    datos_ejemplo = subparsers.add_parser("datos-ejemplo", aliases=["seed"],
+                                          help="Agrega los datos de ejemplo a la base de datos existente, sin borrar nada.")
+    datos_ejemplo.set_defaults(funcion=_comando_datos_ejemplo)
+
+    mantenimiento_parser = subparsers.add_parser("mantenimiento", aliases=["maintenance"],
+                                                 help="Elimina registros huérfanos, ejecuta ANALYZE y compacta la base con VACUUM.")
+    mantenimiento_parser.add_argument("--sin-vacuum", action="store_true", help="No compacta el archivo (VACUUM reescribe toda la base).")
+    mantenimiento_parser.set_defaults(funcion=_comando_mantenimiento)
+
+    sincronizar_parser = subparsers.add_parser("sincronizar", aliases=["sync"],
+                                               help="Envía a otra base de datos los cambios de --db desde la última sincronización.")
+    sincronizar_parser.add_argument("destino", help="Base de datos que recibe los cambios (p. ej. la central).")
+    sincronizar_parser.add_argument("--lote", type=int, default=TAMAÑO_LOTE_SINCRONIZACION, help="Filas por transacción en el destino.")
+    sincronizar_parser.add_argument("--desplazamiento", type=int, default=0,
+                                    help="Se suma a los ids en el destino, para que no choquen los de distintas clínicas.")
+    sincronizar_parser.add_argument("--podar", action="store_true", help="Borra del origen el registro de cambios ya enviado.")
+    sincronizar_parser.set_defaults(funcion=_comando_sincronizar)
+
+    respaldar_parser = subparsers.add_parser("respaldar", aliases=["backup"], help="Copia de seguridad en línea, sin detener la clínica.")
+    respaldar_parser.add_argument("destino", help="Archivo de la copia.")
+    respaldar_parser.add_argument("--paginas", type=int, default=PAGINAS_POR_PASO, help="Páginas copiadas por paso.")
+    respaldar_parser.add_argument("--pausa", type=float, default=PAUSA_ENTRE_PASOS, help="Segundos de pausa entre pasos.")
+    respaldar_parser.set_defaults(funcion=_comando_respaldar)
+
+    restaurar_parser = subparsers.add_parser("restaurar", aliases=["restore"], help="Reemplaza la base de datos por una copia de seguridad.")
+    restaurar_parser.add_argument("respaldo", help="Archivo de la copia.")
+    restaurar_parser.set_defaults(funcion=_comando_restaurar)
+
+    integridad = subparsers.add_parser("verificar-integridad", aliases=["check"],
+                                       help="Verifica la integridad de la base de datos o de una copia.")
+    integridad.add_argument("archivo", nargs="?", help="Copia a verificar (por defecto, --db).")
+    integridad.set_defaults(funcion=_comando_verificar_integridad)
+
+    periodicos = subparsers.add_parser("respaldos-periodicos", aliases=["backup-schedule"],
+                                       help="Hace copias de seguridad cada cierto tiempo hasta Ctrl+C.")
+    periodicos.add_argument("--directorio", default=DIRECTORIO_RESPALDOS)
+    periodicos.add_argument("--intervalo", type=float, default=60, help="Minutos entre copias.")
+    periodicos.add_argument("--conservar", type=int, default=24, help="Cantidad de copias a conservar.")
+    periodicos.set_defaults(funcion=_comando_respaldos_periodicos)
+
+    exportar = subparsers.add_parser("exportar", aliases=["export"],
+                                     help="Exporta las tablas o el historial de mascotas a CSV, JSONL o formato columnar.")
+    exportar.add_argument("fuentes", nargs="*", metavar="FUENTE", help=f"Qué exportar: {', '.join(FUENTES_EXPORTACION)} (por defecto las tres tablas).")
+    exportar.add_argument("--directorio", default=".", help="Carpeta de destino.")
+    exportar.add_argument("--formato", choices=list(FORMATOS_EXPORTACION), default="csv")
+    exportar.add_argument("--comprimir", action="store_true", help="Comprime los CSV y JSONL con gzip.")
+    exportar.set_defaults(funcion=_comando_exportar)
+
+    _agregar_comandos_datos(subparsers)
+
+    lote = subparsers.add_parser("lote", aliases=["batch"],
+                                 help="Ejecuta comandos de datos leídos de un archivo (o '-' para la entrada estándar) en una sola transacción.")
+    lote.add_argument("archivo", nargs="?", default="-", help="Un comando por línea; las líneas con '#' se ignoran.")
+    lote.add_argument("--seguir", action="store_true", help="Descarta solo los comandos que fallen en lugar de todo el lote.")
+    lote.set_defaults(funcion=_comando_lote)
+
+    return parser
+
+def ejecutar_comando(argv):
+    """Ejecuta un comando de línea de comandos y retorna el código de salida."""
+    args = crear_parser().parse_args(argv)
+    if args.trazas or args.metricas or TRAZAS.activo:
+        activar_trazas(args.umbral_lento / 1000, args.registro_lentas)
+    try:
+        if args.comando is None:
+            if args.respaldo_cada:
+                with RespaldoPeriodico(args.db, intervalo=args.respaldo_cada * 60, config=args.pragma):
+                    main(args.db, args.limpio, args.pragma)
+            else:
+                main(args.db, args.limpio, args.pragma)
+            return 0
+        return args.funcion(args)
+    finally:
+        if args.metricas:
+            with open(args.metricas, "w", encoding="utf-8") as archivo:
+                archivo.write(TRAZAS.exportar_prometheus())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(ejecutar_comando(sys.argv[1:]))
\ No newline at end of file
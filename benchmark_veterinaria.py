@@ -0,0 +1,430 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import py_compile
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import admin_veterinaria as av
+
+# --- Generador de Datos Sintéticos ---
+
+NOMBRES = ("Ana", "Luis", "María", "Carlos", "Lucía", "Jorge", "Sofía", "Andrés", "Valentina", "Diego",
+           "Camila", "Mateo", "Isabella", "Santiago", "Daniela", "Juan", "Paula", "Felipe", "Laura", "Miguel")
+APELLIDOS = ("García", "Rodríguez", "Martínez", "López", "González", "Pérez", "Sánchez", "Ramírez",
+             "Torres", "Flores", "Rivera", "Gómez", "Díaz", "Vargas", "Castro", "Rojas")
+NOMBRES_MASCOTAS = ("Luna", "Max", "Coco", "Rocky", "Nala", "Toby", "Simba", "Lola", "Milo", "Kira",
+                    "Bruno", "Canela", "Thor", "Mía", "Zeus", "Frida", "Oreo", "Pelusa", "Manchas", "Chispa")
+# (especie, peso, razas)
+ESPECIES = (
+    ("Perro", 55, ("Labrador", "Criollo", "Pastor Alemán", "Poodle", "Bulldog", "Golden Retriever")),
+    ("Gato", 35, ("Criollo", "Siamés", "Persa", "Angora", "Bengalí")),
+    ("Pájaro", 4, ("Periquito", "Canario", "Loro")),
+    ("Conejo", 3, ("Belier", "Cabeza de León", None)),
+    ("Hámster", 2, ("Sirio", "Ruso", None)),
+    ("Reptil", 1, ("Iguana", "Tortuga", "Gecko")),
+)
+# (motivo, peso, diagnósticos posibles)
+MOTIVOS = (
+    ("Chequeo Anual", 30, ("Todo en orden.", "Sobrepeso leve, ajustar dieta.")),
+    ("Vacunación", 25, ("Vacuna de refuerzo aplicada.", "Vacuna antirrábica aplicada.")),
+    ("Desparasitación", 12, ("Desparasitación interna realizada.",)),
+    ("Problema respiratorio", 8, ("Bronquitis leve, tratamiento con antibióticos.", "Resfriado común.")),
+    ("Problema digestivo", 8, ("Gastroenteritis, dieta blanda.", "Ingesta de cuerpo extraño.")),
+    ("Problema de piel", 7, ("Dermatitis alérgica.", "Pulgas, tratamiento tópico.")),
+    ("Cojera", 5, ("Esguince leve, reposo.", "Fractura, se remite a cirugía.")),
+    ("Control postoperatorio", 5, ("Buena cicatrización.", None)),
+)
+TAMAÑO_LOTE = 10000
+
+def _pesos_zipf(cantidad, exponente):
+    """Pesos acumulados de una distribución de Zipf sobre 'cantidad' elementos."""
+    acumulados = []
+    total = 0.0
+    for rango in range(1, cantidad + 1):
+        total += 1.0 / rango ** exponente
+        acumulados.append(total)
+    return acumulados
+
+def _insertar_por_lotes(conexion, sql, filas):
+    """Inserta las filas de un generador con executemany, un commit por lote."""
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= TAMAÑO_LOTE:
+            conexion.executemany(sql, lote)
+            conexion.commit()
+            lote = []
+    if lote:
+        conexion.executemany(sql, lote)
+        conexion.commit()
+
+def generar_datos(conexion, consultas, semilla=1, dueños=None, mascotas=None, años=3):
+    """
+    Llena una base vacía con datos sintéticos reproducibles y sesgados como en una clínica real (ver README).
+    Retorna (dueños, mascotas, consultas) insertados.
+    """
+    aleatorio = random.Random(semilla)
+    mascotas = mascotas or max(1, consultas // 5)
+    dueños = dueños or max(1, mascotas // 2)
+
+    _insertar_por_lotes(
+        conexion,
+        "INSERT INTO Dueños (id, nombre, telefono, direccion) VALUES (?, ?, ?, ?)",
+        ((i, f"{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)}", f"3{aleatorio.randrange(10**9):09d}",
+          f"Calle {aleatorio.randint(1, 200)} # {aleatorio.randint(1, 99)}-{aleatorio.randint(1, 99)}")
+         for i in range(1, dueños + 1)))
+
+    # El id del dueño (o de la mascota) se sortea con pesos de Zipf y se
+    # desordena con una permutación para que los ids "populares" no sean los primeros.
+    pesos_dueños = _pesos_zipf(dueños, 1.1)
+    permutacion_dueños = list(range(1, dueños + 1))
+    aleatorio.shuffle(permutacion_dueños)
+    pesos_especies = [peso for _, peso, _ in ESPECIES]
+
+    def filas_mascotas():
+        for i in range(1, mascotas + 1):
+            especie, _, razas = aleatorio.choices(ESPECIES, pesos_especies)[0]
+            # Cada dueño tiene al menos una mascota mientras alcancen.
+            if i <= dueños:
+                id_dueño = i
+            else:
+                id_dueño = permutacion_dueños[aleatorio.choices(range(dueños), cum_weights=pesos_dueños)[0]]
+            yield (i, aleatorio.choice(NOMBRES_MASCOTAS), especie, aleatorio.choice(razas), aleatorio.randint(0, 16), id_dueño)
+
+    _insertar_por_lotes(
+        conexion,
+        "INSERT INTO Mascotas (id, nombre, especie, raza, edad, id_dueño) VALUES (?, ?, ?, ?, ?, ?)",
+        filas_mascotas())
+
+    pesos_mascotas = _pesos_zipf(mascotas, 0.8)
+    permutacion_mascotas = list(range(1, mascotas + 1))
+    aleatorio.shuffle(permutacion_mascotas)
+    pesos_motivos = [peso for _, peso, _ in MOTIVOS]
+    hoy = datetime(2025, 6, 30)
+    dias = 365 * años
+
+    def filas_consultas():
+        for _ in range(consultas):
+            motivo, _, diagnosticos = aleatorio.choices(MOTIVOS, pesos_motivos)[0]
+            # Más visitas recientes: la antigüedad se sesga hacia 0.
+            dia = hoy - timedelta(days=int(dias * aleatorio.random() ** 1.5))
+            while dia.weekday() == 6:
+                dia -= timedelta(days=1)
+            momento = dia.replace(hour=aleatorio.randint(8, 17), minute=aleatorio.choice((0, 15, 30, 45)))
+            id_mascota = permutacion_mascotas[aleatorio.choices(range(mascotas), cum_weights=pesos_mascotas)[0]]
+            yield (momento.strftime(av.FORMATO_FECHA), motivo, aleatorio.choice(diagnosticos), id_mascota)
+
+    _insertar_por_lotes(
+        conexion,
+        "INSERT INTO Consultas (fecha, motivo, diagnostico, id_mascota) VALUES (?, ?, ?, ?)",
+        filas_consultas())
+    return dueños, mascotas, consultas
+
+# --- Escalabilidad del Pool de Conexiones ---
+
+def medir_lecturas_pool(ruta, hilos, total_mascotas, duracion=2.0):
+    """
+    Lanza 'hilos' hilos que leen el historial de mascotas al azar a través de un
+    PoolConexiones durante 'duracion' segundos. Retorna las lecturas por segundo.
+    """
+    with av.PoolConexiones(ruta, lectores=hilos) as pool:
+        contadores = [0] * hilos
+        fin = time.perf_counter() + duracion
+        inicio = threading.Barrier(hilos)
+
+        def trabajar(indice):
+            aleatorio = random.Random(indice)
+            inicio.wait()
+            while time.perf_counter() < fin:
+                with pool.lectura() as conexion:
+                    conexion.execute(av.SQL_PAGINA_CONSULTAS_POR_MASCOTA,
+                                     (aleatorio.randint(1, total_mascotas), av.ID_MINIMO, av.TAMAÑO_PAGINA)).fetchall()
+                contadores[indice] += 1
+
+        trabajadores = [threading.Thread(target=trabajar, args=(i,)) for i in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+    return sum(contadores) / duracion
+
+def benchmark_pool(hilos=(1, 2, 4, 8), duracion=2.0, consultas=50000):
+    """Mide el rendimiento de lectura del pool para cada cantidad de hilos."""
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "benchmark.db")
+        conexion, _ = av.abrir_base_datos(ruta)
+        _, total_mascotas, _ = generar_datos(conexion, consultas)
+        conexion.close()
+
+        print("\n--- LECTURAS CONCURRENTES CON PoolConexiones ---")
+        base = None
+        for cantidad in hilos:
+            por_segundo = medir_lecturas_pool(ruta, cantidad, total_mascotas, duracion)
+            base = base or por_segundo
+            print(f"Hilos: {cantidad:3d}  Lecturas/s: {por_segundo:10.0f}  Aceleración: {por_segundo / base:5.2f}x")
+
+# --- Rendimiento de las Operaciones CRUD ---
+
+# La escala de 10 millones no va por defecto: con los triggers de búsqueda,
+# estadísticas y registro de cambios se generan unas 6000 consultas por
+# segundo (casi media hora y unos 2,5 GB). Se pide con --escalas.
+ESCALAS = (10_000, 100_000, 1_000_000)
+ESCALA_MAXIMA = 10_000_000
+REPETICIONES = 200
+UMBRAL_REGRESION = 0.20  # 20 % más lento que la referencia
+
+def _primera_pagina():
+    return False
+
+def _ids_distintos(aleatorio, total, cantidad):
+    """Ids al azar sin repetir, para que cada borrado encuentre su registro."""
+    return [(i,) for i in aleatorio.sample(range(1, total + 1), min(cantidad, total))]
+
+# (nombre, función llamada como funcion(cursor, conexion, *args), argumentos(datos, aleatorio, n))
+# El orden importa: los borrados van al final y el de dueños borra en cascada
+# sus mascotas y consultas.
+OPERACIONES_CRUD = (
+    ("insertar_dueño", av.insertar_dueño, lambda d, a, n: [
+        (f"{a.choice(NOMBRES)} {a.choice(APELLIDOS)}", f"3{a.randrange(10**9):09d}", f"Calle {a.randint(1, 200)}")
+        for _ in range(n)]),
+    ("insertar_mascota", av.insertar_mascota, lambda d, a, n: [
+        (a.choice(NOMBRES_MASCOTAS), "Perro", "Criollo", a.randint(0, 16), a.randint(1, d[0])) for _ in range(n)]),
+    ("insertar_consulta", av.insertar_consulta, lambda d, a, n: [
+        ("2025-07-01 10:00:00", "Vacunación", "Vacuna de refuerzo aplicada.", a.randint(1, d[1])) for _ in range(n)]),
+    ("mostrar_dueños", lambda cursor, conexion: av.mostrar_dueños(cursor, continuar=_primera_pagina),
+     lambda d, a, n: [()] * n),
+    ("mostrar_mascotas_por_dueño", lambda cursor, conexion, id_dueño: av.mostrar_mascotas(cursor, id_dueño, continuar=_primera_pagina),
+     lambda d, a, n: [(a.randint(1, d[0]),) for _ in range(n)]),
+    ("mostrar_consultas_por_mascota", lambda cursor, conexion, id_mascota: av.mostrar_consultas(cursor, id_mascota, continuar=_primera_pagina),
+     lambda d, a, n: [(a.randint(1, d[1]),) for _ in range(n)]),
+    ("actualizar_dueño", lambda cursor, conexion, id_dueño, telefono: av.actualizar_dueño(cursor, conexion, id_dueño, telefono=telefono),
+     lambda d, a, n: [(a.randint(1, d[0]), f"3{a.randrange(10**9):09d}") for _ in range(n)]),
+    ("actualizar_mascota", lambda cursor, conexion, id_mascota, edad: av.actualizar_mascota(cursor, conexion, id_mascota, edad=edad),
+     lambda d, a, n: [(a.randint(1, d[1]), a.randint(0, 16)) for _ in range(n)]),
+    ("actualizar_consulta", lambda cursor, conexion, id_consulta, diagnostico: av.actualizar_consulta(cursor, conexion, id_consulta, diagnostico=diagnostico),
+     lambda d, a, n: [(a.randint(1, d[2]), "Control sin novedades.") for _ in range(n)]),
+    ("eliminar_consulta", lambda cursor, conexion, id_consulta: av.eliminar_registro(cursor, conexion, "Consultas", id_consulta),
+     lambda d, a, n: _ids_distintos(a, d[2], n)),
+    ("eliminar_mascota_cascada", lambda cursor, conexion, id_mascota: av.eliminar_registro(cursor, conexion, "Mascotas", id_mascota),
+     lambda d, a, n: _ids_distintos(a, d[1], n)),
+    ("eliminar_dueño_cascada", lambda cursor, conexion, id_dueño: av.eliminar_registro(cursor, conexion, "Dueños", id_dueño),
+     lambda d, a, n: _ids_distintos(a, d[0], n)),
+)
+
+def _resumir_tiempos(tiempos):
+    """Media, percentiles y operaciones por segundo de una lista de duraciones en segundos."""
+    percentiles = statistics.quantiles(tiempos, n=100, method="inclusive") if len(tiempos) > 1 else tiempos * 99
+    return {
+        "repeticiones": len(tiempos),
+        "media_ms": statistics.fmean(tiempos) * 1000,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "p99_ms": percentiles[98] * 1000,
+        "operaciones_por_segundo": len(tiempos) / sum(tiempos) if sum(tiempos) else None,
+    }
+
+def medir_crud(conexion, datos, repeticiones=REPETICIONES, operaciones=None, semilla=1):
+    """
+    Mide 'repeticiones' llamadas a cada operación de OPERACIONES_CRUD (o a las de 'operaciones') sin salida
+    por pantalla. 'datos' es la tupla (dueños, mascotas, consultas) que retorna generar_datos.
+    """
+    aleatorio = random.Random(semilla)
+    cursor = conexion.cursor()
+    resultados = {}
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for nombre, funcion, argumentos in OPERACIONES_CRUD:
+            if operaciones and nombre not in operaciones:
+                continue
+            tiempos = []
+            for args in argumentos(datos, aleatorio, repeticiones):
+                inicio = time.perf_counter()
+                funcion(cursor, conexion, *args)
+                tiempos.append(time.perf_counter() - inicio)
+            resultados[nombre] = _resumir_tiempos(tiempos)
+    return resultados
+
+def benchmark_crud(escalas=ESCALAS, repeticiones=REPETICIONES, operaciones=None, semilla=1):
+    """Mide las operaciones CRUD sobre una base temporal para cada escala y retorna los resultados para JSON."""
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+        "semilla": semilla,
+        "escalas": {},
+    }
+    for escala in escalas:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "benchmark.db")
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                conexion, _ = av.abrir_base_datos(ruta)
+            av.limpiar_cache()
+            inicio = time.perf_counter()
+            datos = generar_datos(conexion, escala, semilla)
+            generacion = time.perf_counter() - inicio
+            print(f"\n--- ESCALA: {escala} consultas ({datos[0]} dueños, {datos[1]} mascotas), generadas en {generacion:.1f} s ---")
+
+            medidas = medir_crud(conexion, datos, repeticiones, operaciones, semilla)
+            conexion.close()
+        for nombre, medida in medidas.items():
+            print(f"{nombre:30s} p50: {medida['p50_ms']:8.3f} ms  p99: {medida['p99_ms']:8.3f} ms  "
+                  f"Ops/s: {medida['operaciones_por_segundo']:10.0f}")
+        resultados["escalas"][str(escala)] = {
+            "dueños": datos[0],
+            "mascotas": datos[1],
+            "consultas": datos[2],
+            "generacion_segundos": generacion,
+            "operaciones": medidas,
+        }
+    return resultados
+
+def comparar_resultados(referencia, actual, umbral=UMBRAL_REGRESION):
+    """Retorna (escala, operación, p50 referencia, p50 actual) de las operaciones cuya mediana empeoró más que 'umbral'."""
+    regresiones = []
+    for escala, medidas in actual["escalas"].items():
+        base = referencia.get("escalas", {}).get(escala)
+        if not base:
+            continue
+        for nombre, medida in medidas["operaciones"].items():
+            anterior = base["operaciones"].get(nombre)
+            if anterior and medida["p50_ms"] > anterior["p50_ms"] * (1 + umbral):
+                regresiones.append((escala, nombre, anterior["p50_ms"], medida["p50_ms"]))
+    return regresiones
+
+# --- Tiempo de Arranque ---
+
+REPETICIONES_ARRANQUE = 20
+
+def _casos_arranque(ruta, ruta_nueva):
+    """(nombre, argumentos de Python, preparación previa a cada ejecución) de cada caso medido."""
+    comando = ["--db", ruta, "listar-mascotas", "--dueño", "1"]
+
+    def borrar_base_nueva():
+        for sufijo in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(ruta_nueva + sufijo)
+
+    return (
+        ("interprete", ["-c", "pass"], None),
+        ("importar_modulo", ["-c", "import admin_veterinaria"], None),
+        ("comando_modulo", ["-m", "admin_veterinaria", *comando], None),
+        ("comando_script", [av.__file__, *comando], None),
+        ("base_nueva_con_ejemplos", ["-m", "admin_veterinaria", "--db", ruta_nueva, "datos-ejemplo"], borrar_base_nueva),
+    )
+
+def benchmark_arranque(repeticiones=REPETICIONES_ARRANQUE, consultas=10_000, semilla=1):
+    """
+    Mide el tiempo total de procesos nuevos: el intérprete vacío, la importación del módulo, un comando
+    corto sobre una base existente y la creación de una base nueva. Retorna los resultados para JSON.
+    """
+    directorio_modulo = os.path.dirname(os.path.abspath(av.__file__))
+    # El .pyc al día evita recompilar el módulo en cada proceso (ver README).
+    py_compile.compile(av.__file__, doraise=True)
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+        "consultas": consultas,
+        "casos": {},
+    }
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "arranque.db")
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            conexion, _ = av.abrir_base_datos(ruta)
+        generar_datos(conexion, consultas, semilla)
+        conexion.close()
+
+        for nombre, argumentos, preparar in _casos_arranque(ruta, os.path.join(directorio, "nueva.db")):
+            tiempos = []
+            for _ in range(repeticiones):
+                if preparar:
+                    preparar()
+                inicio = time.perf_counter()
+                subprocess.run([sys.executable, *argumentos], cwd=directorio_modulo, check=True,
+                               stdout=subprocess.DEVNULL)
+                tiempos.append(time.perf_counter() - inicio)
+            resultados["casos"][nombre] = _resumir_tiempos(tiempos)
+
+    base = resultados["casos"]["interprete"]["p50_ms"]
+    print(f"\n--- ARRANQUE ({consultas} consultas, {repeticiones} procesos por caso) ---")
+    for nombre, medida in resultados["casos"].items():
+        print(f"{nombre:25s} p50: {medida['p50_ms']:8.1f} ms  p95: {medida['p95_ms']:8.1f} ms  "
+              f"sobre el intérprete: {medida['p50_ms'] - base:8.1f} ms")
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la administración de la veterinaria.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    generar = subparsers.add_parser("generar", help="Crea una base de datos con datos sintéticos.")
+    generar.add_argument("--db", default=av.DB_NAME, help="Archivo a crear (se reemplaza si existe).")
+    generar.add_argument("--consultas", type=int, default=100_000)
+    generar.add_argument("--semilla", type=int, default=1)
+
+    crud = subparsers.add_parser("crud", help="Tiempos de las operaciones de inserción, consulta, actualización y borrado.")
+    crud.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS), help=f"Cantidades de consultas a generar (agregue {ESCALA_MAXIMA} para la escala mayor).")
+    crud.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    crud.add_argument("--operaciones", nargs="+", choices=[nombre for nombre, _, _ in OPERACIONES_CRUD])
+    crud.add_argument("--semilla", type=int, default=1)
+    crud.add_argument("--salida", help="Guarda los resultados en este archivo JSON.")
+    crud.add_argument("--comparar", help="Archivo JSON de referencia para detectar regresiones.")
+    crud.add_argument("--umbral", type=float, default=UMBRAL_REGRESION, help="Empeoramiento tolerado (0.2 = 20 %%).")
+
+    pool = subparsers.add_parser("pool", help="Escalabilidad de las lecturas con PoolConexiones.")
+    pool.add_argument("--hilos", type=int, nargs="+", default=[1, 2, 4, 8])
+    pool.add_argument("--duracion", type=float, default=2.0, help="Segundos por medición.")
+    pool.add_argument("--consultas", type=int, default=50000, help="Tamaño de los datos generados.")
+
+    arranque = subparsers.add_parser("arranque", help="Tiempo de arranque de un comando corto en un proceso nuevo.")
+    arranque.add_argument("--repeticiones", type=int, default=REPETICIONES_ARRANQUE, help="Procesos lanzados por caso.")
+    arranque.add_argument("--consultas", type=int, default=10_000, help="Tamaño de la base de datos existente.")
+    arranque.add_argument("--salida", help="Guarda los resultados en este archivo JSON.")
+
+    args = parser.parse_args()
+    if args.benchmark == "generar":
+        conexion, _ = av.crear_base_datos(args.db)
+        av.migrar_esquema(conexion)
+        inicio = time.perf_counter()
+        dueños, mascotas, consultas = generar_datos(conexion, args.consultas, args.semilla)
+        conexion.close()
+        print(f"Generados {dueños} dueños, {mascotas} mascotas y {consultas} consultas en {time.perf_counter() - inicio:.1f} s.")
+    elif args.benchmark == "crud":
+        resultados = benchmark_crud(args.escalas, args.repeticiones, args.operaciones, args.semilla)
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as archivo:
+                json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+            print(f"\nResultados guardados en {args.salida}")
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as archivo:
+                regresiones = comparar_resultados(json.load(archivo), resultados, args.umbral)
+            print("\n--- COMPARACIÓN CON LA REFERENCIA ---")
+            for escala, nombre, anterior, actual in regresiones:
+                print(f"REGRESIÓN escala {escala} {nombre}: p50 {anterior:.3f} ms -> {actual:.3f} ms")
+            if regresiones:
+                return 1
+            print("Sin regresiones.")
+    elif args.benchmark == "pool":
+        benchmark_pool(args.hilos, args.duracion, args.consultas)
+    elif args.benchmark == "arranque":
+        resultados = benchmark_arranque(args.repeticiones, args.consultas)
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as archivo:
+                json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+            print(f"\nResultados guardados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+import pytest
+
+import admin_veterinaria as av
+
+
+@pytest.fixture
+def crear_base():
+    """Retorna una función que crea una base con datos de ejemplo en la ruta dada; las cierra al terminar."""
+    conexiones = []
+
+    def crear(ruta):
+        conexion, cursor = av.crear_base_datos(str(ruta))
+        av.migrar_esquema(conexion)
+        av.insertar_datos_iniciales(cursor, conexion)
+        conexiones.append(conexion)
+        return conexion
+
+    yield crear
+    for conexion in conexiones:
+        conexion.close()
@@ -0,0 +1,66 @@
+import admin_veterinaria as av
+
+
+def abrir(crear_base, tmp_path):
+    """Una conexión que escribe y otra que solo lee, sobre la misma base y con la caché vacía."""
+    ruta = tmp_path / "veterinaria.db"
+    escritora = crear_base(ruta)
+    lectora = av.conectar(str(ruta))
+    av.limpiar_cache()
+    return escritora, av.RepositorioDueños(escritora, confirmar=False), av.RepositorioDueños(lectora)
+
+
+def test_generacion_descarta_lecturas_anteriores_a_una_invalidacion():
+    cache = av.CacheLRU()
+    generacion = cache.generacion
+    cache.invalidar(("base", 1))
+    assert cache.generacion == generacion + 1
+
+    cache.guardar(("base", 1), "leído antes", generacion)
+    assert cache.obtener(("base", 1)) is None
+    cache.guardar(("base", 1), "leído después", cache.generacion)
+    assert cache.obtener(("base", 1)) == "leído después"
+
+
+def test_commit_descarta_lo_que_otra_conexion_guardo_durante_la_transaccion(crear_base, tmp_path):
+    escritora, dueños, lectura = abrir(crear_base, tmp_path)
+    anterior = lectura.obtener(1).nombre
+
+    dueños.actualizar(1, nombre="Nuevo")
+    # Antes del commit la otra conexión ve y vuelve a guardar la versión anterior.
+    assert lectura.obtener(1).nombre == anterior
+    generacion = av.CACHE_DUEÑOS.generacion
+    escritora.commit()
+
+    assert av.CACHE_DUEÑOS.generacion > generacion
+    assert escritora.invalidaciones_pendientes == []
+    assert lectura.obtener(1).nombre == "Nuevo"
+    lectura.conexion.close()
+
+
+def test_rollback_vacia_las_invalidaciones_pendientes(crear_base, tmp_path):
+    escritora, dueños, lectura = abrir(crear_base, tmp_path)
+    anterior = lectura.obtener(1).nombre
+
+    dueños.actualizar(1, nombre="Deshecho")
+    assert dueños.obtener(1).nombre == "Deshecho"
+    assert len(escritora.invalidaciones_pendientes) == 1
+    escritora.rollback()
+
+    assert escritora.invalidaciones_pendientes == []
+    assert dueños.obtener(1).nombre == anterior
+    assert lectura.obtener(1).nombre == anterior
+    lectura.conexion.close()
+
+
+def test_bloque_with_aplica_las_invalidaciones(crear_base, tmp_path):
+    escritora, dueños, lectura = abrir(crear_base, tmp_path)
+    lectura.obtener(1)
+
+    with escritora:
+        dueños.actualizar(1, nombre="Con with")
+        lectura.obtener(1)
+
+    assert escritora.invalidaciones_pendientes == []
+    assert lectura.obtener(1).nombre == "Con with"
+    lectura.conexion.close()
@@ -0,0 +1,17 @@
+import pytest
+
+import admin_veterinaria as av
+
+
+def test_exportar_no_confirma_la_transaccion_abierta(crear_base, tmp_path):
+    conexion = crear_base(tmp_path / "veterinaria.db")
+    av.RepositorioDueños(conexion, confirmar=False).insertar("Sin confirmar", None, None)
+
+    with pytest.raises(ValueError, match="transacción abierta"):
+        av.exportar_datos(conexion, str(tmp_path / "exportado"))
+    conexion.rollback()
+
+    resultado = av.exportar_datos(conexion, str(tmp_path / "exportado"))
+    filas = resultado["Dueños"][1]
+    assert filas == conexion.execute("SELECT count(*) FROM Dueños").fetchone()[0]
+    assert conexion.execute("SELECT count(*) FROM Dueños WHERE nombre = 'Sin confirmar'").fetchone()[0] == 0
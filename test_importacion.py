@@ -0,0 +1,48 @@
+import pytest
+
+import admin_veterinaria as av
+
+
+def test_normalizar_fila_con_enteros():
+    fila = {"id": "7", "nombre": "Luna", "edad": 3, "id_dueño": " 2 "}
+    assert av._normalizar_fila_importacion("Mascotas", fila) == (7, "Luna", None, None, 3, 2)
+
+
+@pytest.mark.parametrize("edad", [3.7, 3.0, "3.0", True, [3]])
+def test_normalizar_fila_rechaza_enteros_no_validos(edad):
+    fila = {"nombre": "Luna", "edad": edad, "id_dueño": 1}
+    with pytest.raises(ValueError, match="'edad' debe ser un número entero"):
+        av._normalizar_fila_importacion("Mascotas", fila)
+
+
+def test_importar_archivo_rechaza_solo_las_filas_no_validas(crear_base, tmp_path):
+    conexion = crear_base(tmp_path / "veterinaria.db")
+    consulta_existente = conexion.execute("SELECT * FROM Consultas WHERE id = 1").fetchone()
+    consultas_antes = conexion.execute("SELECT count(*) FROM Consultas").fetchone()[0]
+    archivo = tmp_path / "historial.jsonl"
+    archivo.write_text(
+        '{"tabla": "Dueños", "id": 100, "nombre": "Nuevo"}\n'
+        '{"tabla": "Mascotas", "id": 200, "nombre": "Bruno", "especie": "Perro", "id_dueño": 100}\n'
+        '{"tabla": "Consultas", "id": 300, "fecha": "2024-05-01 10:00", "motivo": "Control", "id_mascota": 200}\n'
+        '{"tabla": "Consultas", "id": 1, "fecha": "2024-05-02", "motivo": "Id repetido", "id_mascota": 200}\n'
+        '{"tabla": "Mascotas", "id": 201, "nombre": "Sin dueño", "id_dueño": 999}\n',
+        encoding="utf-8")
+
+    resultado = av.importar_archivo(conexion.cursor(), conexion, str(archivo), tamaño_lote=10)
+
+    assert resultado["insertadas"] == {"Dueños": 1, "Mascotas": 1, "Consultas": 1}
+    assert resultado["rechazadas"] == 2
+    assert sorted(numero for numero, _, _ in resultado["errores"]) == [4, 5]
+    assert not conexion.in_transaction
+    assert conexion.execute("SELECT count(*) FROM Consultas").fetchone()[0] == consultas_antes + 1
+    assert conexion.execute("SELECT * FROM Consultas WHERE id = 1").fetchone() == consulta_existente
+    assert conexion.execute("SELECT id FROM Mascotas WHERE id >= 200").fetchall() == [(200,)]
+    assert av.verificar_estadisticas(conexion) == []
+
+
+def test_importar_archivo_inexistente(crear_base, tmp_path, capsys):
+    crear_base(tmp_path / "veterinaria.db").close()
+    argumentos = ["--db", str(tmp_path / "veterinaria.db"), "importar", str(tmp_path / "no-existe.csv")]
+
+    assert av.ejecutar_comando(argumentos) == 1
+    assert "Error al importar" in capsys.readouterr().err
@@ -0,0 +1,27 @@
+import admin_veterinaria as av
+
+
+def lote(ruta, *argumentos):
+    return av.ejecutar_comando(["--db", str(ruta), "lote", *argumentos])
+
+
+def test_lote_con_archivo_inexistente(crear_base, tmp_path, capsys):
+    crear_base(tmp_path / "veterinaria.db").close()
+
+    assert lote(tmp_path / "veterinaria.db", str(tmp_path / "no-existe.txt")) == 1
+    assert "No se guardó ningún cambio" in capsys.readouterr().err
+
+
+def test_lote_cancelado_no_imprime_ids(crear_base, tmp_path, capsys):
+    crear_base(tmp_path / "veterinaria.db").close()
+    archivo = tmp_path / "comandos.txt"
+    archivo.write_text('agregar-dueño "Ana Ruiz"\nagregar-mascota Luna --dueño 999999\n', encoding="utf-8")
+    capsys.readouterr()
+
+    assert lote(tmp_path / "veterinaria.db", str(archivo)) == 1
+    assert capsys.readouterr().out == ""
+
+    archivo.write_text(f'agregar-dueño "Ana Ruiz" --db {tmp_path / "otra.db"}\n', encoding="utf-8")
+    assert lote(tmp_path / "veterinaria.db", str(archivo)) == 1
+    assert "comando no válido" in capsys.readouterr().err
+    assert not (tmp_path / "otra.db").exists()
@@ -0,0 +1,84 @@
+import admin_veterinaria as av
+
+
+def dueños(conexion):
+    return conexion.execute("SELECT id, nombre, telefono, direccion FROM Dueños ORDER BY id").fetchall()
+
+
+def test_respaldar_y_restaurar(crear_base, tmp_path):
+    ruta = tmp_path / "sucursal.db"
+    conexion = crear_base(ruta)
+    resultado = av.respaldar(conexion, str(tmp_path / "copia.db"))
+    av.RepositorioDueños(conexion).insertar("Posterior", None, None)
+    esperados = dueños(conexion)[:-1]
+    conexion.close()
+
+    anterior = av.restaurar(resultado["ruta"], str(ruta))
+
+    assert anterior == str(ruta) + ".antes-de-restaurar"
+    conexion = av.abrir_base_datos(str(ruta))[0]
+    assert dueños(conexion) == esperados
+    assert av.verificar_integridad(conexion) == []
+    conexion.close()
+
+
+def test_sincronizar_despues_de_restaurar(crear_base, tmp_path):
+    ruta = tmp_path / "sucursal.db"
+    sucursal = crear_base(ruta)
+    central = crear_base(tmp_path / "central.db")
+    central.execute("DELETE FROM Dueños")
+    central.commit()
+
+    av.sincronizar(sucursal, central)
+    copia = av.respaldar(sucursal, str(tmp_path / "copia.db"))["ruta"]
+    av.RepositorioDueños(sucursal).insertar("Nuevo1", None, None)
+    av.sincronizar(sucursal, central)
+    nodo_anterior = sucursal.execute("SELECT id FROM Nodo").fetchone()[0]
+    sucursal.close()
+
+    av.restaurar(copia, str(ruta))
+    sucursal = av.abrir_base_datos(str(ruta))[0]
+    # La copia vuelve a usar el id de 'Nuevo1', que la central ya recibió.
+    av.RepositorioDueños(sucursal).insertar("TrasRestaurar", None, None)
+    resultado = av.sincronizar(sucursal, central)
+
+    assert resultado["origen"] != nodo_anterior
+    assert resultado["desde"] == 0
+    assert dueños(central) == dueños(sucursal)
+    sucursal.close()
+
+
+def test_respaldar_y_restaurar_con_trazas(crear_base, tmp_path):
+    ruta = tmp_path / "sucursal.db"
+    conexion = crear_base(ruta)
+    av.TRAZAS.limpiar()
+    av.activar_trazas()
+    try:
+        copia = av.respaldar(conexion, str(tmp_path / "copia.db"))["ruta"]
+        conexion.close()
+        av.restaurar(copia, str(ruta))
+        assert av._comando_verificar_integridad(av.crear_parser().parse_args(["--db", copia, "check"])) == 0
+        integridad = av.TRAZAS.histogramas["PRAGMA integrity_check"]
+    finally:
+        av.desactivar_trazas()
+        av.TRAZAS.limpiar()
+    # La copia nueva, la copia a restaurar, el resguardo previo y la verificación.
+    assert integridad.cantidad == 4
+    # Sin los PRAGMA de conectar(), la copia sigue en un único archivo.
+    conexion = av.sqlite3.connect(copia)
+    assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conexion.close()
+
+
+def test_restaurar_en_ruta_nueva(crear_base, tmp_path):
+    conexion = crear_base(tmp_path / "sucursal.db")
+    copia = av.respaldar(conexion, str(tmp_path / "copia.db"))["ruta"]
+    ruta = tmp_path / "nueva" / "veterinaria.db"
+    ruta.parent.mkdir()
+
+    assert av.restaurar(copia, str(ruta)) is None
+
+    assert not (tmp_path / "nueva" / "veterinaria.db.antes-de-restaurar").exists()
+    restaurada = av.abrir_base_datos(str(ruta))[0]
+    assert dueños(restaurada) == dueños(conexion)
+    restaurada.close()
@@ -0,0 +1,159 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import admin_veterinaria as av
+
+
+def contenido(conexion, desplazamiento=0):
+    """Filas de las tres tablas, con los ids desplazados como los deja sincronizar()."""
+    return {
+        tabla: [
+            list(av._desplazar(tabla, fila, desplazamiento))
+            for fila in conexion.execute(f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY id")
+        ]
+        for tabla, columnas in av.COLUMNAS_IMPORTACION.items()
+    }
+
+
+def modificar(conexion):
+    dueños = av.RepositorioDueños(conexion)
+    mascotas = av.RepositorioMascotas(conexion)
+    consultas = av.RepositorioConsultas(conexion)
+    id_dueño = dueños.insertar("Nuevo", "555", None)
+    id_mascota = mascotas.insertar("Bruno", "Perro", None, 2, id_dueño)
+    consultas.insertar(datetime(2024, 5, 1, 10), "Vacunación", None, id_mascota)
+    mascotas.actualizar(1, especie="Hurón", id_dueño=id_dueño)
+    consultas.actualizar(1, motivo="Control")
+    dueños.eliminar(2)
+
+
+@pytest.fixture
+def bases(crear_base, tmp_path):
+    sucursal = crear_base(tmp_path / "sucursal.db")
+    central = crear_base(tmp_path / "central.db")
+    central.execute("DELETE FROM Dueños")  # en cascada, también mascotas y consultas
+    central.commit()
+    return sucursal, central
+
+
+def test_sincronizar_modificar_y_volver_a_sincronizar(bases):
+    sucursal, central = bases
+
+    primera = av.sincronizar(sucursal, central)
+    assert contenido(central) == contenido(sucursal)
+
+    modificar(sucursal)
+    segunda = av.sincronizar(sucursal, central)
+
+    assert segunda["desde"] == primera["hasta"]
+    assert segunda["eliminados"]["Dueños"] == 1
+    assert contenido(central) == contenido(sucursal)
+    assert av.verificar_estadisticas(central) == []
+
+    sin_cambios = av.sincronizar(sucursal, central)
+    assert sin_cambios["desde"] == sin_cambios["hasta"] == segunda["hasta"]
+
+
+@pytest.mark.parametrize("llamadas_antes_del_fallo", [1, 4])
+def test_sincronizacion_interrumpida_se_repite(bases, monkeypatch, llamadas_antes_del_fallo):
+    sucursal, central = bases
+    av.sincronizar(sucursal, central)
+    modificar(sucursal)
+
+    # Falla después de confirmar algunos lotes: en las altas o en las bajas.
+    volcar = av._volcar_lotes
+    llamadas = []
+
+    def volcar_con_fallo(destino, sql, filas, tamaño_lote):
+        if len(llamadas) == llamadas_antes_del_fallo:
+            raise av.sqlite3.OperationalError("conexión perdida")
+        llamadas.append(sql)
+        return volcar(destino, sql, filas, tamaño_lote)
+
+    monkeypatch.setattr(av, "_volcar_lotes", volcar_con_fallo)
+    with pytest.raises(av.sqlite3.OperationalError):
+        av.sincronizar(sucursal, central, tamaño_lote=1)
+    monkeypatch.undo()
+
+    assert contenido(central) != contenido(sucursal)
+    resultado = av.sincronizar(sucursal, central, tamaño_lote=1)
+
+    assert resultado["desde"] > 0
+    assert contenido(central) == contenido(sucursal)
+    assert av.verificar_estadisticas(central) == []
+
+
+def test_sincronizar_con_desplazamiento(bases, crear_base, tmp_path):
+    sucursal, central = bases
+    otra = crear_base(tmp_path / "otra.db")
+
+    av.sincronizar(sucursal, central, desplazamiento=1000)
+    av.sincronizar(otra, central, desplazamiento=2000)
+    modificar(sucursal)
+    av.sincronizar(sucursal, central, desplazamiento=1000)
+
+    esperado = {
+        tabla: sorted(contenido(sucursal, 1000)[tabla] + contenido(otra, 2000)[tabla])
+        for tabla in av.COLUMNAS_IMPORTACION
+    }
+    assert contenido(central) == esperado
+    assert av.verificar_estadisticas(central) == []
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_estadisticas_tras_operaciones_aleatorias(bases, semilla):
+    sucursal, central = bases
+    azar = random.Random(semilla)
+    dueños = av.RepositorioDueños(sucursal)
+    mascotas = av.RepositorioMascotas(sucursal)
+    consultas = av.RepositorioConsultas(sucursal)
+
+    def ids(tabla):
+        return [fila[0] for fila in sucursal.execute(f"SELECT id FROM {tabla}")]
+
+    for paso in range(200):
+        operacion = azar.randrange(8)
+        id_dueños, id_mascotas, id_consultas = ids("Dueños"), ids("Mascotas"), ids("Consultas")
+        if operacion == 0 or not id_dueños:
+            dueños.insertar(f"Dueño {paso}", None, None)
+        elif operacion == 1 or not id_mascotas:
+            mascotas.insertar(f"Mascota {paso}", azar.choice(["Perro", "Gato", None]), None, azar.randrange(15),
+                              azar.choice(id_dueños))
+        elif operacion == 2 or not id_consultas:
+            fecha = datetime(2024, 1, 1) + timedelta(days=azar.randrange(365), hours=azar.randrange(24))
+            consultas.insertar(fecha, azar.choice(["Vacunación", "Control", "Cirugía"]), None, azar.choice(id_mascotas))
+        elif operacion == 3:
+            mascotas.actualizar(azar.choice(id_mascotas), especie=azar.choice(["Perro", "Gato", "Ave"]),
+                                id_dueño=azar.choice(id_dueños))
+        elif operacion == 4:
+            fecha = datetime(2023, 1, 1) + timedelta(days=azar.randrange(730))
+            consultas.actualizar(azar.choice(id_consultas), fecha=fecha, motivo=azar.choice(["Control", "Baño"]),
+                                 id_mascota=azar.choice(id_mascotas))
+        elif operacion == 5:
+            dueños.eliminar(azar.choice(id_dueños))
+        elif operacion == 6:
+            mascotas.eliminar(azar.choice(id_mascotas))
+        else:
+            consultas.eliminar(azar.choice(id_consultas))
+        if paso % 50 == 49:
+            av.sincronizar(sucursal, central, tamaño_lote=7)
+
+    assert av.verificar_estadisticas(sucursal) == []
+    av.sincronizar(sucursal, central, tamaño_lote=7)
+    assert contenido(central) == contenido(sucursal)
+    assert av.verificar_estadisticas(central) == []
+
+
+def test_sincronizar_no_confirma_transacciones_abiertas(bases):
+    sucursal, central = bases
+    av.RepositorioDueños(sucursal, confirmar=False).insertar("Sin confirmar", None, None)
+
+    with pytest.raises(ValueError, match="transacción abierta"):
+        av.sincronizar(sucursal, central)
+    sucursal.rollback()
+
+    av.sincronizar(sucursal, central)
+    assert contenido(central) == contenido(sucursal)
+    assert central.execute("SELECT count(*) FROM Dueños WHERE nombre = 'Sin confirmar'").fetchone()[0] == 0
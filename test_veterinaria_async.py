@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import veterinaria_async as va
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.datos = b""
+
+    def write(self, datos):
+        self.datos += datos
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def atender(ruta, *peticiones):
+    """Envía las peticiones a atender_cliente y retorna las respuestas."""
+    async def conversar():
+        lector = asyncio.StreamReader()
+        for peticion in peticiones:
+            lector.feed_data(peticion.encode() + b"\n")
+        lector.feed_eof()
+        escritor = EscritorFalso()
+        async with va.VeterinariaAsync(str(ruta), lectores=1) as veterinaria:
+            await va.atender_cliente(veterinaria, lector, escritor)
+        return [json.loads(linea) for linea in escritor.datos.splitlines()]
+    return asyncio.run(conversar())
+
+
+def test_peticiones_no_validas_responden_error(tmp_path):
+    respuestas = atender(
+        tmp_path / "veterinaria.db",
+        '{"op": "obtener_dueño", "args": [1000000000000000000000000000000]}',
+        '["obtener_dueño"]',
+        '{"op": "obtener_dueño", "args": {"id": 1}}',
+        '{"op": "obtener_dueño", "args": [1]}',
+    )
+
+    assert [respuesta["ok"] for respuesta in respuestas] == [False, False, False, True]
+    assert respuestas[-1]["resultado"] is None
@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import admin_veterinaria as av
+
+# --- API Asíncrona ---
+
+class VeterinariaAsync:
+    """
+    Operaciones de la veterinaria para asyncio: las lecturas corren en un pool de hilos y las escrituras
+    que llegan casi juntas se confirman con un solo commit, cada una en su propio SAVEPOINT.
+    """
+
+    def __init__(self, ruta=av.DB_NAME, lectores=4, max_lote=256, espera_lote=0.002, config=None):
+        self.ruta = ruta
+        self.lectores = lectores
+        self.max_lote = max_lote
+        self.espera_lote = espera_lote
+        self.config = config
+        self._pool = None
+        self._ejecutor = None
+        self._ejecutor_escritura = None
+        self._cola = None
+        self._tarea_escritor = None
+
+    async def abrir(self):
+        """Abre el pool de conexiones y arranca el escritor."""
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.lectores, thread_name_prefix="veterinaria")
+        self._ejecutor_escritura = ThreadPoolExecutor(max_workers=1, thread_name_prefix="veterinaria-escritor")
+        loop = asyncio.get_running_loop()
+        self._pool = await loop.run_in_executor(
+            self._ejecutor, lambda: av.PoolConexiones(self.ruta, self.lectores, self.config))
+        self._cola = asyncio.Queue()
+        self._tarea_escritor = asyncio.create_task(self._escritor())
+        return self
+
+    async def cerrar(self):
+        """Espera a que se confirmen las escrituras pendientes y cierra las conexiones."""
+        if self._tarea_escritor is None:
+            return
+        await self._cola.put(None)
+        await self._tarea_escritor
+        self._tarea_escritor = None
+        await asyncio.get_running_loop().run_in_executor(self._ejecutor, self._pool.cerrar)
+        self._ejecutor.shutdown()
+        self._ejecutor_escritura.shutdown()
+
+    async def __aenter__(self):
+        return await self.abrir()
+
+    async def __aexit__(self, *exc_info):
+        await self.cerrar()
+
+    # --- Escrituras agrupadas ---
+
+    async def _escribir(self, operacion):
+        """Encola operacion(cursor, conexion) y espera su resultado tras el commit del lote."""
+        if self._tarea_escritor is None:
+            raise RuntimeError("VeterinariaAsync no está abierta.")
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((operacion, futuro))
+        return await futuro
+
+    async def _escritor(self):
+        """Toma las escrituras de la cola y las aplica por lotes hasta recibir None."""
+        loop = asyncio.get_running_loop()
+        terminar = False
+        while not terminar:
+            elemento = await self._cola.get()
+            if elemento is None:
+                break
+            lote = [elemento]
+            limite = loop.time() + self.espera_lote
+            while len(lote) < self.max_lote:
+                try:
+                    elemento = self._cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    restante = limite - loop.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        elemento = await asyncio.wait_for(self._cola.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                if elemento is None:
+                    terminar = True
+                    break
+                lote.append(elemento)
+
+            try:
+                resultados = await loop.run_in_executor(self._ejecutor_escritura, self._aplicar_lote, [op for op, _ in lote])
+            except Exception as e:
+                # Falló el commit: ninguna operación del lote quedó guardada.
+                resultados = [e] * len(lote)
+            for (_, futuro), resultado in zip(lote, resultados):
+                if futuro.cancelled():
+                    continue
+                if isinstance(resultado, Exception):
+                    futuro.set_exception(resultado)
+                else:
+                    futuro.set_result(resultado)
+
+    def _aplicar_lote(self, operaciones):
+        """Aplica un lote de operaciones con un solo commit (corre en el hilo escritor)."""
+        resultados = []
+        with self._pool.escritura() as conexion:
+            cursor = conexion.cursor()
+            if not conexion.in_transaction:
+                cursor.execute("BEGIN")
+            for operacion in operaciones:
+                cursor.execute("SAVEPOINT operacion")
+                try:
+                    resultados.append(operacion(cursor, conexion))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO operacion")
+                    resultados.append(e)
+                cursor.execute("RELEASE operacion")
+        return resultados
+
+    # --- Lecturas ---
+
+    async def _leer(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._ejecutor, self._pool.leer, funcion, *args)
+
+    @staticmethod
+    def _pagina(iterar, limite, *args):
+        return lambda cursor: list(itertools.islice(iterar(cursor, *args), limite))
+
+    # --- Operaciones ---
+
+    async def insertar_dueño(self, nombre, telefono, direccion):
+        """Inserta un dueño y retorna su id."""
+        return await self._escribir(
+            lambda cursor, conexion: av.RepositorioDueños(conexion, cursor, confirmar=False).insertar(nombre, telefono, direccion))
+
+    async def insertar_mascota(self, nombre, especie, raza, edad, id_dueño):
+        """Inserta una mascota y retorna su id."""
+        return await self._escribir(
+            lambda cursor, conexion: av.RepositorioMascotas(conexion, cursor, confirmar=False).insertar(nombre, especie, raza, edad, id_dueño))
+
+    async def insertar_consulta(self, fecha, motivo, diagnostico, id_mascota):
+        """Inserta una consulta y retorna su id."""
+        return await self._escribir(
+            lambda cursor, conexion: av.RepositorioConsultas(conexion, cursor, confirmar=False).insertar(fecha, motivo, diagnostico, id_mascota))
+
+    async def mostrar_dueños(self, despues_de=av.ID_MINIMO, limite=av.TAMAÑO_PAGINA):
+        """Retorna una página de dueños con id mayor que 'despues_de'."""
+        return await self._leer(self._pagina(av.iterar_dueños, limite, limite, despues_de))
+
+    async def mostrar_mascotas(self, id_dueño=None, despues_de=av.ID_MINIMO, limite=av.TAMAÑO_PAGINA):
+        """Retorna una página de mascotas, opcionalmente filtradas por id_dueño."""
+        return await self._leer(self._pagina(av.iterar_mascotas, limite, id_dueño, limite, despues_de))
+
+    async def mostrar_consultas(self, id_mascota=None, despues_de=av.ID_MINIMO, limite=av.TAMAÑO_PAGINA):
+        """Retorna una página de consultas, opcionalmente filtradas por id_mascota."""
+        return await self._leer(self._pagina(av.iterar_consultas, limite, id_mascota, limite, despues_de))
+
+    async def obtener_dueño(self, id_dueño):
+        """Retorna el Dueño con ese id (vía caché), o None."""
+        return await self._leer(lambda cursor: av.RepositorioDueños(cursor.connection, cursor).obtener(id_dueño))
+
+    async def obtener_mascota(self, id_mascota):
+        """Retorna la Mascota con ese id (vía caché), o None."""
+        return await self._leer(lambda cursor: av.RepositorioMascotas(cursor.connection, cursor).obtener(id_mascota))
+
+    async def estadisticas_cache(self):
+        """Retorna los aciertos y fallos de las cachés de dueños y mascotas."""
+        return av.estadisticas_cache()
+
+    async def actualizar_dueño(self, id_dueño, **campos):
+        """Actualiza los campos indicados de un dueño. Retorna True si existía."""
+        return await self._actualizar(av.RepositorioDueños, id_dueño, campos)
+
+    async def actualizar_mascota(self, id_mascota, **campos):
+        """Actualiza los campos indicados de una mascota. Retorna True si existía."""
+        return await self._actualizar(av.RepositorioMascotas, id_mascota, campos)
+
+    async def actualizar_consulta(self, id_consulta, **campos):
+        """Actualiza los campos indicados de una consulta. Retorna True si existía."""
+        return await self._actualizar(av.RepositorioConsultas, id_consulta, campos)
+
+    async def _actualizar(self, repositorio, id_registro, campos):
+        campos = {columna: valor for columna, valor in campos.items() if valor is not None}
+        return await self._escribir(
+            lambda cursor, conexion: repositorio(conexion, cursor, confirmar=False).actualizar(id_registro, **campos))
+
+    async def eliminar_registro(self, tabla, id_registro):
+        """Elimina un registro de 'Dueños', 'Mascotas' o 'Consultas'. Retorna True si existía."""
+        if tabla not in av.REPOSITORIOS:
+            raise ValueError(f"Tabla desconocida: {tabla!r}")
+        repositorio = av.REPOSITORIOS[tabla]
+        return await self._escribir(
+            lambda cursor, conexion: repositorio(conexion, cursor, confirmar=False).eliminar(id_registro))
+
+# --- Servidor de Ejemplo ---
+
+# Operaciones que el servidor acepta por la red.
+OPERACIONES = (
+    "insertar_dueño", "insertar_mascota", "insertar_consulta",
+    "mostrar_dueños", "mostrar_mascotas", "mostrar_consultas",
+    "obtener_dueño", "obtener_mascota", "estadisticas_cache",
+    "actualizar_dueño", "actualizar_mascota", "actualizar_consulta",
+    "eliminar_registro",
+)
+# Tipos JSON admitidos como argumentos de una operación.
+VALORES_SIMPLES = (str, int, float, bool, type(None))
+
+async def atender_cliente(veterinaria, lector, escritor):
+    """
+    Atiende a un terminal con una línea JSON por petición ({"op": ..., "args": [...], "kwargs": {...}})
+    y responde {"ok": true, "resultado": ...} o {"ok": false, "error": "..."}.
+    """
+    try:
+        while linea := await lector.readline():
+            try:
+                peticion = json.loads(linea)
+                if not isinstance(peticion, dict):
+                    raise ValueError("La petición debe ser un objeto JSON.")
+                if peticion.get("op") not in OPERACIONES:
+                    raise ValueError(f"Operación desconocida: {peticion.get('op')!r}")
+                args, kwargs = peticion.get("args", []), peticion.get("kwargs", {})
+                if not isinstance(args, list) or not isinstance(kwargs, dict):
+                    raise ValueError("'args' debe ser una lista y 'kwargs' un objeto.")
+                if not all(isinstance(valor, VALORES_SIMPLES) for valor in (*args, *kwargs.values())):
+                    raise ValueError("Los argumentos deben ser textos, números, booleanos o null.")
+                operacion = getattr(veterinaria, peticion["op"])
+                resultado = await operacion(*args, **kwargs)
+                respuesta = {"ok": True, "resultado": resultado}
+            # OverflowError: enteros fuera del rango de 64 bits de SQLite.
+            except (ValueError, TypeError, OverflowError, sqlite3.Error) as e:
+                respuesta = {"ok": False, "error": str(e)}
+            escritor.write(json.dumps(respuesta, ensure_ascii=False).encode() + b"\n")
+            await escritor.drain()
+    finally:
+        escritor.close()
+
+async def servir(ruta=av.DB_NAME, host="127.0.0.1", puerto=8765, lectores=4):
+    """Sirve la API asíncrona por TCP hasta que se cancele la tarea."""
+    async with VeterinariaAsync(ruta, lectores) as veterinaria:
+        servidor = await asyncio.start_server(
+            lambda lector, escritor: atender_cliente(veterinaria, lector, escritor), host, puerto)
+        print(f"Servidor de la veterinaria escuchando en {host}:{puerto}")
+        async with servidor:
+            await servidor.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor asíncrono de la veterinaria (una línea JSON por petición).")
+    parser.add_argument("--db", default=av.DB_NAME)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--lectores", type=int, default=4)
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.db, args.host, args.puerto, args.lectores))
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+if __name__ == "__main__":
+    main()